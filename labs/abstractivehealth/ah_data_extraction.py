@@ -17,8 +17,9 @@ AH_services = ah_services.AH_Services
 
 def main():
     # Step 1: Get AH token
+    token_service = AbstractiveHealthTokenService()
     try:
-        token = AbstractiveHealthTokenService().get_bearer_token()
+        token = token_service.get_bearer_token()
         print("✅ Token obtained:", token[:10] + "...")  # partial token
     except Exception as e:
         print("❌ Failed to get token:", e)
@@ -41,7 +42,9 @@ def main():
 
     # Step 3: Search patient
     try:
-        search_resp = AH_services.search_patient(token, patient, test=True)
+        search_resp = token_service.call_with_bearer_token(
+            lambda token: AH_services.search_patient(token, patient, test=True)
+        )
         print("✅ Patient search response:", search_resp)
     except Exception as e:
         print("❌ Failed to search patient:", e)
@@ -61,12 +64,16 @@ def main():
         timeout = 300  # max wait 5 minutes
         interval = 20  # check every 20 seconds
         start_time = time.time()
-        docs_resp = AH_services.retrieve_patient_docs(token, conversation_id, patient_id, test=True)
+        docs_resp = token_service.call_with_bearer_token(
+            lambda token: AH_services.retrieve_patient_docs(token, conversation_id, patient_id, test=True)
+        )
 
         while docs_resp.get("processing", True):
             print("⏳ Documents still processing... waiting 20 seconds")
             time.sleep(interval)
-            docs_resp = AH_services.retrieve_patient_docs(token, conversation_id, patient_id, test=True)
+            docs_resp = token_service.call_with_bearer_token(
+                lambda token: AH_services.retrieve_patient_docs(token, conversation_id, patient_id, test=True)
+            )
 
             if time.time() - start_time > timeout:
                 print("❌ Timeout waiting for documents")
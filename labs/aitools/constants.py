@@ -1,7 +1 @@
-openai_api_key = ""
-
-patient_data = {
-    "conditions": [],
-    "medications": [],
-    "biography": {}
-}
\ No newline at end of file
+openai_api_key = ""
\ No newline at end of file
@@ -1,19 +1,28 @@
+import asyncio
+import json
 import logging
-from typing import Optional, List, Dict, Any
+from contextlib import aclosing
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Iterator
 import dotenv
 import streamlit as st
-from agents import Runner
+from agents import InputGuardrailTripwireTriggered
 import os
 import sys
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from labs.aitools.constants import patient_data
+from labs.aitools.tools.agent_registry import iterate_async, stream_text
 from labs.aitools.tools.enhancer.enhancer_agent import create_result_enhancer_agent
+from labs.aitools.tools.fhir.context import PatientContext, PatientConditionRecord, PatientMedicationRecord, \
+    PatientConditionsResult, PatientMedicationsResult
 from labs.aitools.tools.fhir.fhir_agent import create_fhir_agent
-from labs.aitools.tools.guardrail.guardrail_agent import create_guardrail_agent
+from labs.aitools.tools.guardrail.guardrail_agent import create_guardrail_agent, \
+    stream_with_optimistic_guardrails
+from labs.aitools.tools.medication.functions.utils import fetch_medication_info, format_medication_info, \
+    find_indexed_relationships, format_indexed_relationships
 from labs.aitools.tools.medication.matcher_agent import create_medication_matcher_agent
+from labs.aitools.tools.response_cache import answer_cache
 
 dotenv.load_dotenv()
 
@@ -22,37 +31,119 @@ logging.basicConfig(level=logging.INFO)
 st.set_page_config(page_title="FHIR Healthcare Assistant", layout="wide")
 
 
-def analyze_medication_condition_relationships(conditions: List[str], medications: List[str],
-                                               patient_id: str = "1") -> str:
+async def _gather_medication_facts(conditions: List[str], medications: List[str]):
+    return await asyncio.gather(fetch_medication_info(medications),
+                                find_indexed_relationships(conditions, medications))
+
+
+async def stream_medication_condition_relationships(conditions: List[PatientConditionRecord],
+                                                   medications: List[PatientMedicationRecord],
+                                                   patient_id: str = "1") -> AsyncIterator[str]:
     """
-    Analyze which medications are treating which conditions using the Medication Condition Matcher agent.
+    Stream the analysis of which medications are treating which conditions.
+
+    Relationships found in the local drug index are yielded first, then the Medication Condition
+    Matcher agent's analysis as it is generated.
 
     Args:
-        conditions: List of patient conditions
-        medications: List of patient medications
+        conditions: The patient's conditions, as returned by the FHIR tools
+        medications: The patient's medications, as returned by the FHIR tools
         patient_id: The ID of the patient
 
     Returns:
-        Analysis of which medications are treating which conditions
+        Async iterator over the text of the analysis
+    """
+    medication_matcher = create_medication_matcher_agent(use_openai=True)
+
+    # Prefetch every monograph and look up the indexed pairs concurrently, so the agent
+    # starts from known facts instead of spending turns on lookups
+    monographs, (indications, interactions) = await _gather_medication_facts(
+        [condition.name for condition in conditions], [medication.name for medication in medications]
+    )
+    fdb_information = "\n".join(format_medication_info(drug_name, result)
+                                for drug_name, result in monographs.items())
+    known_relationships = format_indexed_relationships(indications, interactions)
+    if indications or interactions:
+        yield f"### Known relationships (FDB)\n\n{known_relationships}\n"
+
+    matcher_input = f"""
+    Patient data retrieved by the FHIR tools:
+{patient_data_json(patient_id, conditions, medications)}
+
+    FDB information for these medications, already retrieved:
+{fdb_information}
+
+    Relationships found in the local drug index:
+{known_relationships}
+
+    Identify which medications treat which conditions, the uses of each medication, and any
+    interactions between the medications.
     """
-    try:
 
-        medication_matcher = create_medication_matcher_agent(use_openai=True)
+    async with aclosing(stream_text(medication_matcher, matcher_input)) as texts:
+        async for text in texts:
+            yield text
 
-        # TODO:
-        # Construct a prompt for the medication matcher agent to analyze:
-        # - Patient ID
-        # - List of conditions
-        # - List of medications
-        # The agent will identify medication-condition relationships, uses, and interactions
 
-        matcher_input = f"""
-        """
+def stream_to_placeholder(placeholder, shown: str, texts: Iterator[str]) -> str:
+    """
+    Render text below shown as it arrives, replacing whatever else the placeholder showed.
+
+    Returns:
+        The text that was streamed
+    """
+    streamed = ""
+    for text in texts:
+        streamed += text
+        placeholder.markdown(shown + streamed + "▌")
+    return streamed
 
-        result = Runner.run_sync(medication_matcher, matcher_input)
-        return result.final_output
-    except Exception as e:
-        return f"Error analyzing medication-condition relationships: {str(e)}"
+
+def collect_patient_data(tool_outputs: List[Any], patient_context: Optional[PatientContext] = None) \
+        -> Tuple[Optional[str], List[PatientConditionRecord], List[PatientMedicationRecord]]:
+    """
+    Conditions and medications the FHIR tools returned during a run.
+
+    Only the patient the last of those tool calls was about is kept. A section the run did not
+    fetch is taken from what earlier turns loaded into the session's patient context.
+
+    Args:
+        tool_outputs: Objects returned by the run's tool calls, in order
+        patient_context: The session's patient context, if any
+
+    Returns:
+        (patient id or None if no tool returned patient data, conditions, medications)
+    """
+    patients: Dict[str, Dict[str, list]] = {}
+    patient_id = None
+    for output in tool_outputs:
+        if isinstance(output, PatientConditionsResult):
+            patient_id = output.patient_id
+            patients.setdefault(patient_id, {})["conditions"] = output.conditions
+        elif isinstance(output, PatientMedicationsResult):
+            patient_id = output.patient_id
+            patients.setdefault(patient_id, {})["medications"] = output.medications
+
+    if patient_id is None:
+        return None, [], []
+
+    conditions = patients[patient_id].get("conditions")
+    medications = patients[patient_id].get("medications")
+    record = patient_context.patients.get(patient_id) if patient_context else None
+    if record is not None:
+        conditions = conditions if conditions is not None else record.conditions
+        medications = medications if medications is not None else record.medications
+    return patient_id, list(conditions or []), list(medications or [])
+
+
+def patient_data_json(patient_id: str, conditions: List[PatientConditionRecord],
+                      medications: List[PatientMedicationRecord]) -> str:
+    """The patient's records as compact JSON for agent inputs."""
+    return json.dumps({
+        "patient_id": patient_id,
+        "conditions": [condition.model_dump() for condition in conditions],
+        "medications": [medication.model_dump(exclude_defaults=True) for medication in medications]
+    })
 
 
 def main():
@@ -70,6 +161,10 @@ def main():
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+    # Patient data loaded by the FHIR tools, kept for this browser session only
+    if "patient_context" not in st.session_state:
+        st.session_state.patient_context = PatientContext()
+
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
@@ -93,32 +188,69 @@ def main():
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
 
-            try:
-
-                with st.spinner(f"Thinking using {model_name}..."):
-                    import asyncio
-                    import json
-                    import re
-
-                    # TODO:
-                    #streamlit run medication_matcher.py
-                    # Step-by-step process:
-                    # 1. Set up asyncio event loop for async operations
-                    # 2. Get primary response from the agent using the user's prompt
-                    # 3. Extract conditions and medications from patient data
-                    # 4. If no conditions/medications found in patient data:
-                    #    - Parse conditions and medications from the primary output using regex
-                    # 5. Prepare input string for the enhancer agent with:
-                    #    - Original response
-                    #    - User query
-                    #    - Extracted conditions and medications
-                    # 6. Get enhanced response from enhancer agent
-                    # 7. If both conditions and medications exist:
-                    #    - Analyze medication-condition relationships
-                    #    - Add analysis to final output
-                    # 8. Display final output and update session state
-
+            message_placeholder.markdown(f"_Thinking using {model_name}..._")
 
+            try:
+                patient_context = st.session_state.patient_context
+                asked_patient_id = patient_context.current_patient_id
+                cached = answer_cache.get(prompt, asked_patient_id, model_name)
+                if cached:
+                    final_output, answer_patient_id = cached
+                    if answer_patient_id:
+                        patient_context.record(answer_patient_id)
+                else:
+                    # Agents and their pooled clients are shared, so every run streams on the shared loop.
+                    # The primary answer is only a draft: the enhancer's output replaces it once it streams.
+                    tool_outputs = []
+                    primary_output = stream_to_placeholder(message_placeholder, "", iterate_async(
+                        stream_with_optimistic_guardrails(primary_agent, prompt, context=patient_context,
+                                                          on_tool_output=tool_outputs.append)
+                    ))
+                    message_placeholder.markdown(f"{primary_output}\n\n_Enhancing the answer..._")
+
+                    # The FHIR tools' records are passed on as they are, instead of parsed back out of the text
+                    patient_id, conditions, medications = collect_patient_data(tool_outputs, patient_context)
+
+                    enhancer_input = f"""
+                    Original response:
+                    {primary_output}
+
+                    User query: {prompt}
+                    """
+                    if patient_id:
+                        enhancer_input += f"""
+                    Patient data retrieved by the FHIR tools:
+                    {patient_data_json(patient_id, conditions, medications)}
+                    """
+                    final_output = stream_to_placeholder(message_placeholder, "", iterate_async(
+                        stream_text(enhancer_agent, enhancer_input, context=patient_context)
+                    ))
+
+                    analysis_failed = False
+                    if conditions and medications:
+                        final_output += "\n\n## Medication-Condition Analysis\n\n"
+                        analysis = ""
+                        try:
+                            for text in iterate_async(stream_medication_condition_relationships(
+                                    conditions, medications, patient_id)):
+                                analysis += text
+                                message_placeholder.markdown(final_output + analysis + "▌")
+                        except Exception as e:
+                            analysis_failed = True
+                            analysis += f"\n\nError analyzing medication-condition relationships: {str(e)}"
+                        final_output += analysis
+
+                    if not analysis_failed:
+                        answer_cache.put(prompt, asked_patient_id, model_name, final_output,
+                                         patient_context.current_patient_id)
+
+                message_placeholder.markdown(final_output)
+                st.session_state.messages.append({"role": "assistant", "content": final_output})
+
+            except InputGuardrailTripwireTriggered:
+                refusal = "I can only help with questions about patient data or healthcare information."
+                message_placeholder.markdown(refusal)
+                st.session_state.messages.append({"role": "assistant", "content": refusal})
             except Exception as e:
                 error_message = f"Error: {str(e)}"
                 message_placeholder.markdown(error_message)
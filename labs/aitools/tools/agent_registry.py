@@ -0,0 +1,170 @@
+import asyncio
+import threading
+from typing import Dict, Tuple, Callable, Any, Coroutine, AsyncIterator, Iterator, Optional, Awaitable, TypeVar
+
+from agents import OpenAIChatCompletionsModel, Agent, Runner, RawResponsesStreamEvent, RunItemStreamEvent
+from openai import AsyncOpenAI
+
+from labs.aitools.constants import openai_api_key
+
+# Provider -> OpenAI-compatible endpoint and the model used with it
+PROVIDERS = {
+    "openai": {
+        "base_url": "https://api.openai.com/v1",
+        "model": "gpt-4o-mini"
+    },
+    "ollama": {
+        "base_url": "http://localhost:11434/v1",
+        "model": "llama3.2"
+    }
+}
+
+_lock = threading.RLock()
+_clients: Dict[str, AsyncOpenAI] = {}
+_models: Dict[Tuple[str, str], OpenAIChatCompletionsModel] = {}
+_agents: Dict[Tuple[str, str, str], Agent] = {}
+_loop = None
+
+T = TypeVar("T")
+
+
+def provider_name(use_openai: bool = False) -> str:
+    return "openai" if use_openai else "ollama"
+
+
+def get_openai_client(provider: str) -> AsyncOpenAI:
+    """
+    Shared AsyncOpenAI client for a provider.
+
+    Every model and agent using the provider goes through this client's connection pool.
+    """
+    with _lock:
+        if provider not in _clients:
+            _clients[provider] = AsyncOpenAI(
+                base_url=PROVIDERS[provider]["base_url"],
+                # Ollama doesn't check API keys, but the OpenAI client requires one
+                api_key=openai_api_key if provider == "openai" else "dummy-key"
+            )
+        return _clients[provider]
+
+
+def get_model(use_openai: bool = False) -> OpenAIChatCompletionsModel:
+    provider = provider_name(use_openai)
+    model_name = PROVIDERS[provider]["model"]
+    with _lock:
+        if (provider, model_name) not in _models:
+            _models[(provider, model_name)] = OpenAIChatCompletionsModel(
+                model=model_name,
+                openai_client=get_openai_client(provider)
+            )
+        return _models[(provider, model_name)]
+
+
+def get_agent(name: str, use_openai: bool, build: Callable[[OpenAIChatCompletionsModel], Agent]) -> Agent:
+    """
+    Build an agent once per process for each provider and model, and return the same instance afterwards.
+
+    Args:
+        name: Registry name of the agent
+        use_openai: Boolean flag to use OpenAI instead of Ollama
+        build: Creates the agent for a model
+
+    Returns:
+        The shared Agent instance
+    """
+    provider = provider_name(use_openai)
+    key = (name, provider, PROVIDERS[provider]["model"])
+    with _lock:
+        if key not in _agents:
+            _agents[key] = build(get_model(use_openai))
+        return _agents[key]
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Process-wide event loop running on a background thread.
+
+    Agent runs all use this loop, so the pooled connections of the shared clients, which belong
+    to the loop that opened them, stay usable from one Streamlit rerun to the next.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agent-event-loop", daemon=True).start()
+        return _loop
+
+
+def run_async(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine on the shared event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop()).result()
+
+
+def iterate_async(iterable: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Iterate an async iterator on the shared event loop, yielding its items on the calling thread.
+
+    Stopping early closes the async iterator, so whatever it started is cleaned up.
+    """
+    iterator = iterable.__aiter__()
+
+    async def next_item():
+        return await iterator.__anext__()
+
+    try:
+        while True:
+            try:
+                yield run_async(next_item())
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(iterator, "aclose"):
+            run_async(iterator.aclose())
+
+
+async def stream_text(agent: Agent, input_data: Any, context: Any = None, gate: Optional[Awaitable[Any]] = None,
+                      on_tool_output: Optional[Callable[[Any], None]] = None) -> AsyncIterator[str]:
+    """
+    Run an agent with the streaming runner and yield its output text as the model generates it.
+
+    Text from separate model responses, e.g. before and after a tool call, is separated by a
+    blank line. Closing the iterator early cancels the run.
+
+    Args:
+        agent: The agent to run
+        input_data: The agent's input
+        context: The run context
+        gate: Awaited before any text is yielded; the run starts straight away and its text is
+            held back until the gate completes. If the gate raises, the run is cancelled.
+        on_tool_output: Called with the object each tool call returns, before the model sees str() of it
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        emitted = new_response = False
+        try:
+            async for event in Runner.run_streamed(agent, input_data, context=context).stream_events():
+                if isinstance(event, RunItemStreamEvent) and event.name == "tool_output" and on_tool_output:
+                    on_tool_output(event.item.output)
+                if not isinstance(event, RawResponsesStreamEvent):
+                    continue
+                if event.data.type == "response.created":
+                    new_response = True
+                elif event.data.type == "response.output_text.delta" and event.data.delta:
+                    if new_response and emitted:
+                        queue.put_nowait("\n\n")
+                    queue.put_nowait(event.data.delta)
+                    emitted, new_response = True, False
+        finally:
+            queue.put_nowait(None)
+
+    # Cancelling the task iterating the stream makes the runner cancel the run itself
+    pump_task = asyncio.create_task(pump())
+    try:
+        if gate is not None:
+            await gate
+        while (text := await queue.get()) is not None:
+            yield text
+        await pump_task
+    finally:
+        pump_task.cancel()
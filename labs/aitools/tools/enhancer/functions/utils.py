@@ -1,10 +1,15 @@
 from agents import function_tool
 
-from lof.services import IMONormalizeService
+from labs.aitools.tools.response_cache import tool_result_cache
+from lof.services import BatchingIMONormalizer
+
+# Shared so concurrent tool calls are sent to IMO as one batched request per domain
+imo_normalizer = BatchingIMONormalizer()
 
 
 @function_tool
-def normalize_medication_with_imo(medication_name: str) -> str:
+@tool_result_cache.memoize
+async def normalize_medication_with_imo(medication_name: str) -> str:
     """
     Normalize a medication name using IMO Precision Normalize API
 
@@ -15,8 +20,7 @@ def normalize_medication_with_imo(medication_name: str) -> str:
         Formatted string with normalized medication data
     """
     try:
-        imo_service = IMONormalizeService()
-        result = imo_service.normalize_text(entities=[medication_name], domain="medication")
+        result = await imo_normalizer.normalize(medication_name, domain="medication")
 
         if "error" in result:
             return f"Error normalizing medication: {result['error']}"
@@ -60,7 +64,8 @@ def normalize_medication_with_imo(medication_name: str) -> str:
         return f"Error processing IMO normalization: {str(e)}"
 
 @function_tool
-def normalize_problem_with_imo(problem_name: str) -> str:
+@tool_result_cache.memoize
+async def normalize_problem_with_imo(problem_name: str) -> str:
     """
     Normalize a problem/condition name using IMO Precision Normalize API
 
@@ -71,8 +76,7 @@ def normalize_problem_with_imo(problem_name: str) -> str:
         Formatted string with normalized problem data
     """
     try:
-        imo_service = IMONormalizeService()
-        result = imo_service.normalize_text(entities=[problem_name], domain="problem")
+        result = await imo_normalizer.normalize(problem_name, domain="problem")
 
         if "error" in result:
             return f"Error normalizing problem: {result['error']}"
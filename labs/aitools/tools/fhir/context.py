@@ -0,0 +1,183 @@
+import time
+from typing import Optional, List, Dict
+
+from pydantic import BaseModel, Field as PydanticField
+
+# Seconds loaded patient data is reused across turns before the FHIR tools fetch it again
+PATIENT_DATA_MAX_AGE_SECONDS = 300
+
+
+class PatientConditionRecord(BaseModel):
+    """
+    A patient's condition as reported by the FHIR tools.
+
+    Fields:
+    - name: Display name of the condition
+    - status: Clinical status code (active, resolved, etc) or "unknown"
+    """
+    name: str
+    status: str = "unknown"
+
+
+class PatientMedicationRecord(BaseModel):
+    """
+    A patient's medication request as reported by the FHIR tools.
+
+    Fields:
+    - name: Display name of the medication
+    - status: Request status (active, completed, etc)
+    - dosage: Dosage instruction text, empty if not given
+    """
+    name: str
+    status: Optional[str] = None
+    dosage: str = ""
+
+
+class PatientBiography(BaseModel):
+    """
+    A patient's demographics as reported by the FHIR tools.
+    """
+    name: str
+    id: str
+    gender: str
+    birthDate: str
+    maritalStatus: str
+    address: str
+    contact: str
+
+
+class PatientConditionsResult(BaseModel):
+    """
+    Structured result of get_patient_conditions.
+
+    Agents see str() of a tool result, so the model gets the formatted text while the pipeline
+    reads the records from the run's tool outputs.
+    """
+    patient_id: str
+    conditions: List[PatientConditionRecord]
+
+    def __str__(self) -> str:
+        if not self.conditions:
+            return f"No conditions found for patient {self.patient_id}."
+
+        result = f"Found {len(self.conditions)} conditions for patient {self.patient_id}:\n"
+        for condition in self.conditions:
+            result += f"- {condition.name} (Status: {condition.status})\n"
+        return result
+
+
+class PatientMedicationsResult(BaseModel):
+    """
+    Structured result of get_patient_medications, formatted for the model by str().
+    """
+    patient_id: str
+    medications: List[PatientMedicationRecord]
+
+    def __str__(self) -> str:
+        if not self.medications:
+            return f"No medications found for patient {self.patient_id}."
+
+        result = f"Found {len(self.medications)} medication requests for patient {self.patient_id}:\n"
+        for med in self.medications:
+            result += f"- {med.name} (Status: {med.status}){' - Dosage: ' + med.dosage if med.dosage else ''}\n"
+        return result
+
+
+class PatientBiographyResult(BaseModel):
+    """
+    Structured result of get_patient_biography, formatted for the model by str().
+    """
+    patient_id: str
+    biography: Optional[PatientBiography] = None
+
+    def __str__(self) -> str:
+        biography = self.biography
+        if biography is None:
+            return f"No patient found with ID {self.patient_id}."
+
+        result = f"Patient Information:\n"
+        result += f"- Name: {biography.name}\n"
+        result += f"- ID: {biography.id}\n"
+        result += f"- Gender: {biography.gender}\n"
+        result += f"- Birth Date: {biography.birthDate}\n"
+        result += f"- Marital Status: {biography.maritalStatus}\n"
+        result += f"- Address: {biography.address}\n"
+        result += f"- Contact: {biography.contact}\n"
+        return result
+
+
+class PatientRecord(BaseModel):
+    """
+    Data loaded so far for one patient.
+
+    Each section is None until a tool loads it, and remembers when it was loaded and the FHIR
+    cache data version it was built from, so later turns can reuse it while it is current.
+    """
+    patient_id: str
+    conditions: Optional[List[PatientConditionRecord]] = None
+    medications: Optional[List[PatientMedicationRecord]] = None
+    biography: Optional[PatientBiography] = None
+    loaded_at: Dict[str, float] = PydanticField(default_factory=dict)
+    data_versions: Dict[str, int] = PydanticField(default_factory=dict)
+
+    def is_current(self, section: str, data_version: int) -> bool:
+        if getattr(self, section) is None or section not in self.loaded_at:
+            return False
+        if self.data_versions.get(section) != data_version:
+            return False
+        return time.time() - self.loaded_at[section] <= PATIENT_DATA_MAX_AGE_SECONDS
+
+    def set_conditions(self, conditions: List[PatientConditionRecord], data_version: int):
+        unique = {}
+        for condition in conditions:
+            unique.setdefault((condition.name.lower(), condition.status), condition)
+        self.conditions = list(unique.values())
+        self._mark_loaded("conditions", data_version)
+
+    def set_medications(self, medications: List[PatientMedicationRecord], data_version: int):
+        unique = {}
+        for medication in medications:
+            unique.setdefault((medication.name.lower(), medication.status, medication.dosage), medication)
+        self.medications = list(unique.values())
+        self._mark_loaded("medications", data_version)
+
+    def set_biography(self, biography: PatientBiography, data_version: int):
+        self.biography = biography
+        self._mark_loaded("biography", data_version)
+
+    def _mark_loaded(self, section: str, data_version: int):
+        self.loaded_at[section] = time.time()
+        self.data_versions[section] = data_version
+
+
+class PatientContext:
+    """
+    Session-scoped patient data store, passed to agent runs as the RunContextWrapper context.
+
+    Replaces the module-level patient_data dict, so concurrent sessions no longer overwrite
+    each other and data loaded on one turn is reused on the next.
+    """
+
+    def __init__(self):
+        self.patients: Dict[str, PatientRecord] = {}
+        # Patient the most recent tool call was about
+        self.current_patient_id: Optional[str] = None
+
+    def record(self, patient_id: str) -> PatientRecord:
+        self.current_patient_id = patient_id
+        if patient_id not in self.patients:
+            self.patients[patient_id] = PatientRecord(patient_id=patient_id)
+        return self.patients[patient_id]
+
+    def current(self) -> Optional[PatientRecord]:
+        if self.current_patient_id is None:
+            return None
+        return self.patients.get(self.current_patient_id)
+
+    def current_conditions(self) -> List[PatientConditionRecord]:
+        record = self.current()
+        return list(record.conditions or []) if record else []
+
+    def current_medications(self) -> List[PatientMedicationRecord]:
+        record = self.current()
+        return list(record.medications or []) if record else []
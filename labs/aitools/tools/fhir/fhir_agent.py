@@ -1,7 +1,7 @@
 from agents import OpenAIChatCompletionsModel, Agent, InputGuardrail
-from openai import AsyncOpenAI
 
-from labs.aitools.constants import openai_api_key
+from labs.aitools.tools.agent_registry import get_agent
+from labs.aitools.tools.fhir.context import PatientContext
 from labs.aitools.tools.fhir.functions.utils import get_patient_biography, get_patient_conditions, \
     get_patient_medications
 from labs.aitools.tools.guardrail.guardrail_agent import medical_query_guardrail
@@ -11,62 +11,42 @@ def create_fhir_agent(use_openai=False):
     """
     Create the primary FHIR healthcare assistant agent.
 
+    The agent is built once per process and model and shared by every Streamlit session.
+
     Args:
         use_openai: Boolean flag to use OpenAI instead of Ollama
 
     Returns:
         Agent instance configured with FHIR tools
     """
-    if use_openai:
-        model = OpenAIChatCompletionsModel(
-            model="gpt-4o-mini",
-            openai_client=AsyncOpenAI(
-                base_url="https://api.openai.com/v1",
-                api_key=openai_api_key
-            )
-        )
-    else:
-        model = OpenAIChatCompletionsModel(
-            model="llama3.2",
-            openai_client=AsyncOpenAI(
-                base_url="http://localhost:11434/v1",
-                api_key="dummy-key"  # Ollama doesn't check API keys, but OpenAI client requires one
-            )
-        )
+    return get_agent("fhir", use_openai, _build_fhir_agent)
 
-    """
-    #TODO:
-    # Instructions for creating FHIR Agent Instructions:
-    # 1. Define the agent's role as a healthcare assistant
-    # 2. Specify the data retrieval capabilities:
-    #    - Biographical details (name, gender, DOB, etc)
-    #    - Medical conditions and diagnoses
-    #    - Medication information
-    # 3. Set behavior guidelines:
-    #    - Always request patient ID if missing
-    #    - Present information clearly
-    #    - No medical advice
-    #    - Use tools only for patient data
-    # 4. Define tool usage rules:
-    #    - get_patient_biography for personal info (get_patient_biography)
-    #    - get_patient_conditions for diagnoses (get_patient_conditions)
-    #    - get_patient_medications for prescriptions (get_patient_medications)
-    """
+
+def _build_fhir_agent(model: OpenAIChatCompletionsModel) -> Agent:
     fhir_agent_instructions = """
+        You are a healthcare assistant that answers questions about patients using their FHIR records.
+
+        You can retrieve:
+        - Biographical details such as name, gender, date of birth, marital status, address and contact
+        - Medical conditions and diagnoses
+        - Medication prescriptions and dosages
+
+        Guidelines:
+        - If the user has not given a patient ID, ask for it before retrieving any data.
+        - Present the information clearly, using lists where there are several items.
+        - Do not give medical advice.
+        - Only use the tools to retrieve patient data.
+
+        Tools:
+        - Use get_patient_biography for personal information.
+        - Use get_patient_conditions for diagnoses.
+        - Use get_patient_medications for prescriptions.
         """
 
-    """
-    TODO:
-    Instructions for creating FHIR Agent:
-    1. Set agent name as "FHIR Healthcare Assistant"
-    2. Pass the detailed instructions defined above
-    3. Configure required tools:
-       - get_patient_biography: Retrieves patient demographic info (get_patient_biography)
-       - get_patient_conditions: Retrieves patient diagnoses (get_patient_conditions)
-       - get_patient_medications: Retrieves patient prescriptions (get_patient_medications)
-    4. Add input guardrails for medical query validation
-    5. Use the specified language model
-    """
-    fhir_agent = None
-
-    return fhir_agent
+    return Agent[PatientContext](
+        name="FHIR Healthcare Assistant",
+        instructions=fhir_agent_instructions,
+        tools=[get_patient_biography, get_patient_conditions, get_patient_medications],
+        input_guardrails=[InputGuardrail(guardrail_function=medical_query_guardrail)],
+        model=model
+    )
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, List, Iterable
+from urllib.parse import urlencode, urlsplit, parse_qsl
+
+# Seconds a cached response is served without asking the server
+DEFAULT_FRESH_SECONDS = 60
+# Seconds after which a cached response is dropped instead of revalidated
+DEFAULT_MAX_AGE_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 1024
+# Requests whose last known version is remembered, per cache entry, so data that changed while
+# its entry was evicted or expired still moves the patient's data version on
+FINGERPRINTS_PER_ENTRY = 4
+# Medications are shared formulary items, kept longer and without revalidation
+DEFAULT_MEDICATION_TTL_SECONDS = 24 * 3600
+DEFAULT_MEDICATION_MAX_ENTRIES = 2048
+
+
+@dataclass
+class CachedResponse:
+    body: Dict[str, Any]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    resource_type: Optional[str]
+    patient_id: Optional[str]
+    stored_at: float
+    validated_at: float
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Canonical request URL, with query parameters sorted so equivalent searches share an entry."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + [(key, str(value)) for key, value in (params or {}).items()]
+    base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+    return f"{base}?{urlencode(sorted(query))}" if query else base
+
+
+def _describe(key: str, base_url: str) -> Tuple[Optional[str], Optional[str]]:
+    """Resource type and patient id a cached request belongs to, for invalidation."""
+    parts = urlsplit(key)
+    path = parts.path[len(urlsplit(base_url).path):].strip("/").split("/")
+    resource_type = path[0] if path and path[0] else None
+    query = dict(parse_qsl(parts.query))
+    patient_id = query.get("patient") or query.get("subject")
+    if resource_type == "Patient":
+        patient_id = path[1] if len(path) > 1 else query.get("_id", patient_id)
+    if patient_id and patient_id.startswith("Patient/"):
+        patient_id = patient_id.split("/", 1)[1]
+    return resource_type, patient_id
+
+
+def _content(body: Dict[str, Any]) -> Any:
+    """The patient data in a response; a Bundle's id, timestamp and links can differ on every search."""
+    if body.get("resourceType") == "Bundle":
+        return [entry.get("resource") for entry in body.get("entry", [])]
+    return body
+
+
+def _fingerprint(body: Dict[str, Any], etag: Optional[str]) -> Tuple[Optional[str], str]:
+    """ETag and content digest identifying a version of a response; search Bundles' ETags are per response."""
+    digest = hashlib.sha256(json.dumps(_content(body), sort_keys=True, default=str).encode()).hexdigest()
+    return (etag if body.get("resourceType") != "Bundle" else None), digest
+
+
+class FHIRResourceCache:
+    """
+    LRU cache of FHIR GET responses keyed by resource type, id and search parameters.
+
+    Entries younger than fresh_seconds are served locally. Older entries are revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged resource costs a 304 instead of a full
+    download. Entries older than max_age_seconds are discarded.
+
+    Each patient has a data version that is bumped whenever one of their resources changes or
+    is invalidated, so derived caches can tell when their inputs are stale. Changes are detected
+    against the last version stored for a request, even after its entry was evicted or expired.
+    """
+
+    def __init__(self, base_url: str, fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.base_url = base_url
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._patient_versions: Dict[str, int] = {}
+        # key -> (patient id, fingerprint) of the last version stored for every request
+        self._fingerprints: "OrderedDict[str, Tuple[Optional[str], Tuple[Optional[str], str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> Tuple[Optional[CachedResponse], bool]:
+        """
+        Returns:
+            (entry, fresh) where entry is None on a miss and fresh means it can be used without
+            revalidation
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry.stored_at > self.max_age_seconds:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if now - entry.validated_at <= self.fresh_seconds:
+                self.hits += 1
+                return entry, True
+            self.revalidations += 1
+            return entry, False
+
+    def store(self, key: str, body: Dict[str, Any], etag: Optional[str] = None,
+              last_modified: Optional[str] = None):
+        resource_type, patient_id = _describe(key, self.base_url)
+        fingerprint = _fingerprint(body, etag)
+        now = time.time()
+        with self._lock:
+            previous = self._fingerprints.pop(key, None)
+            if patient_id and previous is not None and previous[1] != fingerprint:
+                self._bump(patient_id)
+            self._fingerprints[key] = (patient_id, fingerprint)
+            while len(self._fingerprints) > self.max_entries * FINGERPRINTS_PER_ENTRY:
+                # A later change to a forgotten request could not be detected, so assume one
+                _, (forgotten_patient_id, _) = self._fingerprints.popitem(last=False)
+                if forgotten_patient_id:
+                    self._bump(forgotten_patient_id)
+            self._entries[key] = CachedResponse(body, etag, last_modified, resource_type, patient_id, now, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def mark_validated(self, key: str):
+        """Record a 304 for key, restarting its fresh window."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.validated_at = time.time()
+
+    def discard(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            self._fingerprints.pop(key, None)
+            if entry is not None and entry.patient_id:
+                self._bump(entry.patient_id)
+
+    def patient_entries(self, patient_id: str) -> List[Tuple[str, CachedResponse]]:
+        """(key, entry) of every cached request belonging to a patient."""
+        with self._lock:
+            return [(key, entry) for key, entry in self._entries.items() if entry.patient_id == patient_id]
+
+    def patient_version(self, patient_id: str) -> int:
+        with self._lock:
+            return self._patient_versions.get(patient_id, 0)
+
+    def _bump(self, patient_id: str):
+        self._patient_versions[patient_id] = self._patient_versions.get(patient_id, 0) + 1
+
+    def invalidate(self, resource_type: str, resource_id: Optional[str] = None):
+        """Drop cached reads and searches for a resource type, or reads of a single resource."""
+        with self._lock:
+            for key in list(self._entries):
+                entry = self._entries[key]
+                if entry.resource_type != resource_type:
+                    continue
+                path = urlsplit(key).path.rstrip("/")
+                if resource_id is None or path.endswith(f"/{resource_type}/{resource_id}"):
+                    del self._entries[key]
+                    self._fingerprints.pop(key, None)
+                    if entry.patient_id:
+                        self._bump(entry.patient_id)
+
+    def invalidate_patient(self, patient_id: str):
+        """Drop everything cached for a patient, e.g. after writing to their record."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.patient_id == patient_id]:
+                del self._entries[key]
+            for key in [key for key, (owner, _) in self._fingerprints.items() if owner == patient_id]:
+                del self._fingerprints[key]
+            self._bump(patient_id)
+
+    def clear(self):
+        with self._lock:
+            patient_ids = set(self._patient_versions)
+            patient_ids.update(owner for owner, _ in self._fingerprints.values() if owner)
+            self._entries.clear()
+            self._fingerprints.clear()
+            for patient_id in patient_ids:
+                self._bump(patient_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses
+        }
+
+
+class MedicationCache:
+    """
+    Process-wide LRU of parsed Medication resources keyed by id.
+
+    The same formulary items are referenced by many patients' medication requests, so resolved
+    references are reused across patients and sessions for ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_MEDICATION_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MEDICATION_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, medication_ids: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Returns:
+            (cached medications keyed by id, ids that are not cached) with duplicate ids removed
+        """
+        now = time.time()
+        found = {}
+        missing = []
+        with self._lock:
+            for medication_id in dict.fromkeys(medication_ids):
+                entry = self._entries.get(medication_id)
+                if entry is None or now - entry[1] > self.ttl_seconds:
+                    self._entries.pop(medication_id, None)
+                    self.misses += 1
+                    missing.append(medication_id)
+                    continue
+                self._entries.move_to_end(medication_id)
+                self.hits += 1
+                found[medication_id] = entry[0]
+        return found, missing
+
+    def put(self, medication_id: str, medication: Any):
+        with self._lock:
+            self._entries[medication_id] = (medication, time.time())
+            self._entries.move_to_end(medication_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, medication_id: str):
+        with self._lock:
+            self._entries.pop(medication_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
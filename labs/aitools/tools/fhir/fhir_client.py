@@ -1,7 +1,86 @@
-from typing import Optional, List, Dict, Any
-from labs.aitools.tools.fhir.model import FHIRCondition, FHIRMedicationRequest, FHIRMedication, FHIRPatient
+import asyncio
+import importlib.util
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator, Type, TypeVar
+from urllib.parse import urljoin
+
+import httpx
+from pydantic import BaseModel
+
+from labs.aitools.tools.fhir.fhir_cache import FHIRResourceCache, MedicationCache, cache_key
+from labs.aitools.tools.fhir.model import FHIRCondition, FHIRMedicationRequest, FHIRMedication, FHIRPatient, \
+    FHIRPatientSummary
 import requests
 
+FHIR_HEADERS = {"Accept": "application/fhir+json"}
+# Entries requested per Bundle page; bounds how much of a search is held in memory at once
+DEFAULT_PAGE_SIZE = 50
+
+# Resource types requested from Patient/$everything for a summary
+SUMMARY_RESOURCE_TYPES = "Patient,Condition,MedicationRequest,Medication"
+# Status codes meaning the server does not implement Patient/$everything
+EVERYTHING_UNSUPPORTED_STATUS_CODES = (405, 501)
+# Status codes that only mean it when the OperationOutcome says so; otherwise a 404 is an unknown patient
+EVERYTHING_OUTCOME_STATUS_CODES = (400, 404)
+UNSUPPORTED_OPERATION_PATTERN = re.compile(
+    r"not supported|unknown operation|not implemented|does not know how to handle", re.IGNORECASE
+)
+# Status codes meaning the server cannot search Medication by a list of ids
+ID_SEARCH_UNSUPPORTED_STATUS_CODES = (400, 404, 405, 501)
+# Medication ids per Medication?_id=a,b,c search, keeps the query string a sensible length
+MEDICATION_ID_BATCH_SIZE = 50
+# Concurrent Medication reads when the server cannot search by a list of ids
+MEDICATION_FETCH_WORKERS = 8
+# Concurrent conditional GETs, and the seconds each may take, when revalidating a cached
+# answer's data; the chat waits on them
+REVALIDATE_WORKERS = 8
+REVALIDATE_TIMEOUT_SECONDS = 5.0
+
+# Async client connection pool, timeout and retry settings
+ASYNC_POOL_SIZE = 20
+ASYNC_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+ASYNC_MAX_RETRIES = 3
+ASYNC_BACKOFF_SECONDS = 0.5
+RETRY_STATUS_CODES = (429, 503)
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# orjson decodes large Bundles several times faster than the json module
+ORJSON_AVAILABLE = importlib.util.find_spec("orjson") is not None
+if ORJSON_AVAILABLE:
+    import orjson
+
+ResourceModel = TypeVar("ResourceModel", bound=BaseModel)
+
+
+def _json_body(response) -> Dict[str, Any]:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _everything_unsupported(response) -> bool:
+    """Whether a failed Patient/$everything response means the server does not implement the operation."""
+    if response.status_code in EVERYTHING_UNSUPPORTED_STATUS_CODES:
+        return True
+    if response.status_code not in EVERYTHING_OUTCOME_STATUS_CODES:
+        return False
+    try:
+        outcome = response.json()
+    except ValueError:
+        return False
+    if not isinstance(outcome, dict) or outcome.get("resourceType") != "OperationOutcome":
+        return False
+    return any(issue.get("code") == "not-supported" or
+               UNSUPPORTED_OPERATION_PATTERN.search(issue.get("diagnostics") or "")
+               for issue in outcome.get("issue", []))
+
+
+def _batches(items: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 
 class FHIRClient:
     """
@@ -10,54 +89,281 @@ class FHIRClient:
     Provides methods to retrieve patient data, conditions, medications, and other healthcare information.
     """
 
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, cache: Optional[FHIRResourceCache] = None,
+                 medication_cache: Optional[MedicationCache] = None):
         self.base_url = base_url
+        self.cache = cache
+        self.medication_cache = medication_cache
+        # None until the first summary request finds out whether Patient/$everything works
+        self.supports_everything: Optional[bool] = None
+        # None until the first batch medication lookup finds out whether Medication?_id=a,b,c works
+        self.supports_id_search: Optional[bool] = None
 
-    def get_patient_conditions(self, patient_id: str) -> List[FHIRCondition]:
+    def iter_search(self, resource_type: str, params: Dict[str, Any], model: Type[ResourceModel],
+                    page_size: int = DEFAULT_PAGE_SIZE, limit: Optional[int] = None) -> Iterator[ResourceModel]:
         """
-        Get conditions for a specific patient from the FHIR server.
+        Stream the results of a FHIR search, following Bundle next links page by page.
+
+        Only one page is held in memory at a time and each resource is parsed into its model
+        as it is yielded.
 
         Args:
-            patient_id: The ID of the patient to retrieve conditions for
+            resource_type: The FHIR resource type to search, e.g. "Condition"
+            params: Search parameters
+            model: Pydantic model to parse each matching resource into
+            page_size: Entries requested per page (_count)
+            limit: Optional maximum number of resources to yield
 
         Returns:
-            List of FHIRCondition objects
+            Iterator of model instances
+        """
+        yielded = 0
+        for resource in self._iter_bundle_resources(f"{self.base_url}/{resource_type}", params, page_size):
+            if resource.get("resourceType", resource_type) != resource_type:
+                continue
+            yield model(**resource)
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+    def _iter_bundle_resources(self, url: str, params: Dict[str, Any],
+                               page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """Yield the raw resources of a Bundle and all of its following pages."""
+        params = dict(params, _count=page_size)
+        while url:
+            bundle = self._get_json(url, params)
+
+            for entry in bundle.get("entry", []):
+                if entry.get("resource"):
+                    yield entry["resource"]
+
+            url = self._next_page_url(bundle)
+            # The next link already carries the search parameters
+            params = None
+
+    def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  not_found_ok: bool = False) -> Optional[Dict[str, Any]]:
         """
-        url = f"{self.base_url}/Condition?patient={patient_id}"
-        response = requests.get(url, headers={"Accept": "application/fhir+json"})
+        GET a FHIR URL as JSON, through the resource cache when one is configured.
+
+        Returns:
+            The response body, or None for a 404 when not_found_ok is set
+        """
+        key, entry, headers = self._cache_lookup(url, params)
+        if entry is not None and headers is None:
+            return entry.body
+        response = requests.get(url, params=params, headers=headers)
+        return self._handle_response(key, entry, response, not_found_ok)
+
+    def _cache_lookup(self, url: str, params: Optional[Dict[str, Any]]):
+        """
+        Returns:
+            (cache key, cached entry, request headers); headers is None when the entry is fresh
+        """
+        if self.cache is None:
+            return None, None, FHIR_HEADERS
+        key = cache_key(url, params)
+        entry, fresh = self.cache.lookup(key)
+        if entry is None:
+            return key, None, FHIR_HEADERS
+        if fresh:
+            return key, entry, None
+        return key, entry, dict(FHIR_HEADERS, **entry.conditional_headers())
+
+    def revalidate_patient(self, patient_id: str, timeout: float = REVALIDATE_TIMEOUT_SECONDS) -> int:
+        """
+        Revalidate every cached request for a patient with a conditional GET, however recent it is.
+
+        Unchanged responses cost a 304. Changed or deleted ones are updated in the cache and bump
+        the patient's data version. The requests are sent concurrently.
+
+        Args:
+            patient_id: The ID of the patient
+            timeout: Seconds each request may take before requests.Timeout is raised
+
+        Returns:
+            Number of cached requests revalidated, 0 when nothing is cached for the patient
+        """
+        if self.cache is None:
+            return 0
+        entries = self.cache.patient_entries(patient_id)
+
+        def revalidate(key, entry):
+            response = requests.get(key, headers=dict(FHIR_HEADERS, **entry.conditional_headers()), timeout=timeout)
+            self._handle_response(key, entry, response, not_found_ok=True)
+
+        if entries:
+            with ThreadPoolExecutor(max_workers=min(len(entries), REVALIDATE_WORKERS)) as executor:
+                for future in [executor.submit(revalidate, key, entry) for key, entry in entries]:
+                    future.result()
+        return len(entries)
+
+    def _handle_response(self, key, entry, response, not_found_ok: bool) -> Optional[Dict[str, Any]]:
+        if response.status_code == 304 and entry is not None:
+            self.cache.mark_validated(key)
+            return entry.body
+        if response.status_code == 404 and not_found_ok:
+            if key is not None:
+                self.cache.discard(key)
+            return None
         response.raise_for_status()
+        body = _json_body(response)
+        if key is not None:
+            self.cache.store(key, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return body
 
-        data = response.json()
-        conditions = []
-        if "entry" in data:
-            for entry in data["entry"]:
-                if "resource" in entry:
-                    conditions.append(FHIRCondition(**entry["resource"]))
+    def _next_page_url(self, bundle: Dict[str, Any]) -> Optional[str]:
+        for link in bundle.get("link", []):
+            if link.get("relation") == "next" and link.get("url"):
+                return urljoin(self.base_url + "/", link["url"])
+        return None
 
-        return conditions
+    def iter_patient_conditions(self, patient_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                limit: Optional[int] = None) -> Iterator[FHIRCondition]:
+        """
+        Stream conditions for a specific patient, page by page.
+
+        Args:
+            patient_id: The ID of the patient to retrieve conditions for
+            page_size: Entries requested per page
+            limit: Optional maximum number of conditions to yield
+
+        Returns:
+            Iterator of FHIRCondition objects
+        """
+        return self.iter_search("Condition", {"patient": patient_id}, FHIRCondition, page_size, limit)
 
-    def get_patient_medications(self, patient_id: str) -> List[FHIRMedicationRequest]:
+    def iter_patient_medications(self, patient_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                 limit: Optional[int] = None) -> Iterator[FHIRMedicationRequest]:
         """
-        Get medication requests for a specific patient from the FHIR server.
+        Stream medication requests for a specific patient, page by page.
 
         Args:
             patient_id: The ID of the patient to retrieve medications for
+            page_size: Entries requested per page
+            limit: Optional maximum number of medication requests to yield
+
+        Returns:
+            Iterator of FHIRMedicationRequest objects
+        """
+        return self.iter_search("MedicationRequest", {"patient": patient_id}, FHIRMedicationRequest, page_size,
+                                limit)
+
+    def get_patient_conditions(self, patient_id: str, limit: Optional[int] = None) -> List[FHIRCondition]:
+        """
+        Get conditions for a specific patient from the FHIR server, across all result pages.
+
+        Args:
+            patient_id: The ID of the patient to retrieve conditions for
+            limit: Optional maximum number of conditions to return
+
+        Returns:
+            List of FHIRCondition objects
+        """
+        return list(self.iter_patient_conditions(patient_id, limit=limit))
+
+    def get_patient_medications(self, patient_id: str, limit: Optional[int] = None) -> List[FHIRMedicationRequest]:
+        """
+        Get medication requests for a specific patient from the FHIR server, across all result pages.
+
+        Args:
+            patient_id: The ID of the patient to retrieve medications for
+            limit: Optional maximum number of medication requests to return
 
         Returns:
             List of FHIRMedicationRequest objects
         """
-        url = f"{self.base_url}/MedicationRequest?patient={patient_id}"
-        response = requests.get(url, headers={"Accept": "application/fhir+json"})
+        return list(self.iter_patient_medications(patient_id, limit=limit))
+
+    def get_patient_summary(self, patient_id: str) -> Optional[FHIRPatientSummary]:
+        """
+        Get a patient's demographics, conditions, medication requests and referenced medications at once.
+
+        Uses Patient/$everything when the server supports it. Otherwise runs the Patient, Condition
+        and MedicationRequest searches concurrently, with referenced Medications pulled in through
+        _include, so no per-medication lookups are needed.
+
+        Args:
+            patient_id: The ID of the patient to summarize
+
+        Returns:
+            FHIRPatientSummary object or None if the patient was not found
+        """
+        resources = None
+        if self.supports_everything is not False:
+            resources = self._fetch_everything(patient_id)
+        if resources is None:
+            resources = self._fetch_summary_searches(patient_id)
+        return self._build_summary(patient_id, resources)
+
+    def _fetch_everything(self, patient_id: str) -> Optional[List[Dict[str, Any]]]:
+        url = f"{self.base_url}/Patient/{patient_id}/$everything"
+        try:
+            resources = list(self._iter_bundle_resources(url, {"_type": SUMMARY_RESOURCE_TYPES}))
+        except requests.HTTPError as e:
+            if e.response is None:
+                raise
+            return self._everything_failed(e.response)
+        self.supports_everything = True
+        return resources
+
+    def _everything_failed(self, response) -> Optional[List[Dict[str, Any]]]:
+        """
+        Handle a failed Patient/$everything request.
+
+        Returns:
+            None to fall back to the summary searches, or no resources for an unknown patient
+        """
+        if _everything_unsupported(response):
+            self.supports_everything = False
+            return None
+        if response.status_code == 404:
+            # The patient does not exist, which says nothing about the operation
+            return []
+        if response.status_code == 400:
+            # e.g. a rejected _type; fall back this time without ruling the operation out
+            return None
         response.raise_for_status()
 
-        data = response.json()
-        medications = []
-        if "entry" in data:
-            for entry in data["entry"]:
-                if "resource" in entry:
-                    medications.append(FHIRMedicationRequest(**entry["resource"]))
+    def _fetch_summary_searches(self, patient_id: str) -> List[Dict[str, Any]]:
+        searches = [
+            ("Patient", {"_id": patient_id}),
+            ("Condition", {"patient": patient_id}),
+            ("MedicationRequest", {"patient": patient_id, "_include": "MedicationRequest:medication"}),
+        ]
+        with ThreadPoolExecutor(max_workers=len(searches)) as executor:
+            futures = [executor.submit(self._search_resources, resource_type, params)
+                       for resource_type, params in searches]
+            return [resource for future in futures for resource in future.result()]
 
-        return medications
+    def _search_resources(self, resource_type: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return list(self._iter_bundle_resources(f"{self.base_url}/{resource_type}", params))
+
+    def _build_summary(self, patient_id: str, resources: List[Dict[str, Any]]) -> Optional[FHIRPatientSummary]:
+        patient = None
+        conditions = []
+        medication_requests = []
+        medications = {}
+        for resource in resources:
+            resource_type = resource.get("resourceType")
+            if resource_type == "Patient" and resource.get("id") == patient_id:
+                patient = FHIRPatient(**resource)
+            elif resource_type == "Condition":
+                conditions.append(FHIRCondition(**resource))
+            elif resource_type == "MedicationRequest":
+                medication_requests.append(FHIRMedicationRequest(**resource))
+            elif resource_type == "Medication" and resource.get("id"):
+                medications[resource["id"]] = FHIRMedication(**resource)
+        self._remember_medications(medications)
+
+        if patient is None:
+            return None
+        return FHIRPatientSummary(
+            patient=patient,
+            conditions=conditions,
+            medication_requests=medication_requests,
+            medications=medications
+        )
 
     def get_medication_by_id(self, medication_id: str) -> Optional[FHIRMedication]:
         """
@@ -69,16 +375,93 @@ class FHIRClient:
         Returns:
             FHIRMedication object or None if not found
         """
+        cached, _ = self._cached_medications([medication_id])
+        if cached:
+            return cached[medication_id]
+
         url = f"{self.base_url}/Medication/{medication_id}"
-        response = requests.get(url, headers={"Accept": "application/fhir+json"})
+        data = self._get_json(url, not_found_ok=True)
 
-        if response.status_code == 404:
+        if data is None:
             return None
 
-        response.raise_for_status()
-        data = response.json()
+        medication = FHIRMedication(**data)
+        self._remember_medications({medication_id: medication})
+        return medication
+
+    def get_medications_by_ids(self, medication_ids: List[str]) -> Dict[str, FHIRMedication]:
+        """
+        Get several medication resources at once.
+
+        Ids already in the medication cache are not requested again. The rest are fetched with
+        Medication?_id=a,b,c searches, or with concurrent reads if the server cannot search by a
+        list of ids.
+
+        Args:
+            medication_ids: The IDs of the medications to retrieve, duplicates allowed
+
+        Returns:
+            Dict of FHIRMedication objects keyed by id, without ids the server does not have
+        """
+        medications, missing = self._cached_medications(medication_ids)
+        for batch in _batches(missing, MEDICATION_ID_BATCH_SIZE):
+            fetched = None
+            if self.supports_id_search is not False:
+                fetched = self._search_medications(batch)
+            if fetched is None:
+                with ThreadPoolExecutor(max_workers=min(len(batch), MEDICATION_FETCH_WORKERS)) as executor:
+                    fetched = dict(zip(batch, executor.map(self.get_medication_by_id, batch)))
+            medications.update(self._found_medications(fetched))
+        return medications
+
+    def resolve_medication_references(self,
+                                      medication_requests: List[FHIRMedicationRequest]) -> Dict[str, FHIRMedication]:
+        """
+        Fetch every Medication referenced by a list of medication requests in one batch.
+
+        Args:
+            medication_requests: Medication requests, e.g. from get_patient_medications
+
+        Returns:
+            Dict of FHIRMedication objects keyed by FHIRMedicationRequest.medication_id
+        """
+        medication_ids = [request.medication_id for request in medication_requests]
+        return self.get_medications_by_ids([medication_id for medication_id in medication_ids if medication_id])
+
+    def _search_medications(self, medication_ids: List[str]) -> Optional[Dict[str, FHIRMedication]]:
+        try:
+            resources = self._search_resources("Medication", {"_id": ",".join(medication_ids)})
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in ID_SEARCH_UNSUPPORTED_STATUS_CODES:
+                self.supports_id_search = False
+                return None
+            raise
+        self.supports_id_search = True
+        return self._medications_from_resources(resources, medication_ids)
+
+    @staticmethod
+    def _medications_from_resources(resources: List[Dict[str, Any]],
+                                    medication_ids: List[str]) -> Dict[str, FHIRMedication]:
+        # A server that ignores _id returns other medications too
+        wanted = set(medication_ids)
+        return {resource["id"]: FHIRMedication(**resource) for resource in resources
+                if resource.get("resourceType") == "Medication" and resource.get("id") in wanted}
+
+    def _found_medications(self, fetched: Dict[str, Optional[FHIRMedication]]) -> Dict[str, FHIRMedication]:
+        found = {medication_id: medication for medication_id, medication in fetched.items() if medication is not None}
+        self._remember_medications(found)
+        return found
+
+    def _cached_medications(self, medication_ids: List[str]):
+        if self.medication_cache is None:
+            return {}, list(dict.fromkeys(medication_ids))
+        return self.medication_cache.get_many(medication_ids)
 
-        return FHIRMedication(**data)
+    def _remember_medications(self, medications: Dict[str, FHIRMedication]):
+        if self.medication_cache is None:
+            return
+        for medication_id, medication in medications.items():
+            self.medication_cache.put(medication_id, medication)
 
     def get_patient_by_id(self, patient_id: str) -> Optional[FHIRPatient]:
         """
@@ -91,17 +474,229 @@ class FHIRClient:
             FHIRPatient object or None if not found
         """
         url = f"{self.base_url}/Patient/{patient_id}"
-        response = requests.get(url, headers={"Accept": "application/fhir+json"})
+        data = self._get_json(url, not_found_ok=True)
 
-        if response.status_code == 404:
+        if data is None:
             return None
 
-        response.raise_for_status()
-        data = response.json()
-
         return FHIRPatient(**data)
 
 
+class AsyncFHIRClient(FHIRClient):
+    """
+    Asyncio counterpart of FHIRClient for use inside agent tools.
+
+    Requests share a pooled httpx.AsyncClient (HTTP/2 when available) with timeouts, and
+    429/503 responses or connection errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, base_url: str, cache: Optional[FHIRResourceCache] = None,
+                 medication_cache: Optional[MedicationCache] = None, pool_size: int = ASYNC_POOL_SIZE,
+                 timeout: httpx.Timeout = ASYNC_TIMEOUT, max_retries: int = ASYNC_MAX_RETRIES):
+        super().__init__(base_url, cache, medication_cache)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_loop = None
+
+    def _client(self) -> httpx.AsyncClient:
+        # httpx connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_client.is_closed or self._http_client_loop is not loop:
+            if self._http_client is not None and self._http_client_loop is not loop:
+                self._close_on_own_loop(self._http_client_loop, self._http_client)
+            self._http_client = httpx.AsyncClient(
+                headers=FHIR_HEADERS,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                http2=HTTP2_AVAILABLE
+            )
+            self._http_client_loop = loop
+        return self._http_client
+
+    async def _get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                   headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self._client().get(url, params=params, headers=headers)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+            await asyncio.sleep(self._retry_delay(attempt))
+            attempt += 1
+
+    async def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                        not_found_ok: bool = False) -> Optional[Dict[str, Any]]:
+        key, entry, headers = self._cache_lookup(url, params)
+        if entry is not None and headers is None:
+            return entry.body
+        response = await self._get(url, params=params, headers=headers)
+        return self._handle_response(key, entry, response, not_found_ok)
+
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        return ASYNC_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    def _close_on_own_loop(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        # A client whose loop has closed can no longer close its transports, dropping it
+        # lets the garbage collector release the sockets
+        if not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def aclose(self):
+        if self._http_client is not None:
+            if self._http_client_loop is asyncio.get_running_loop():
+                await self._http_client.aclose()
+            else:
+                self._close_on_own_loop(self._http_client_loop, self._http_client)
+            self._http_client = None
+
+    async def iter_search(self, resource_type: str, params: Dict[str, Any], model: Type[ResourceModel],
+                          page_size: int = DEFAULT_PAGE_SIZE,
+                          limit: Optional[int] = None) -> AsyncIterator[ResourceModel]:
+        """
+        Stream the results of a FHIR search, following Bundle next links page by page.
+
+        Args:
+            resource_type: The FHIR resource type to search, e.g. "Condition"
+            params: Search parameters
+            model: Pydantic model to parse each matching resource into
+            page_size: Entries requested per page (_count)
+            limit: Optional maximum number of resources to yield
+
+        Returns:
+            Async iterator of model instances
+        """
+        yielded = 0
+        async for resource in self._iter_bundle_resources(f"{self.base_url}/{resource_type}", params, page_size):
+            if resource.get("resourceType", resource_type) != resource_type:
+                continue
+            yield model(**resource)
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+    async def _iter_bundle_resources(self, url: str, params: Dict[str, Any],
+                                     page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        params = dict(params, _count=page_size)
+        while url:
+            bundle = await self._get_json(url, params)
+
+            for entry in bundle.get("entry", []):
+                if entry.get("resource"):
+                    yield entry["resource"]
+
+            url = self._next_page_url(bundle)
+            params = None
+
+    def iter_patient_conditions(self, patient_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                limit: Optional[int] = None) -> AsyncIterator[FHIRCondition]:
+        return self.iter_search("Condition", {"patient": patient_id}, FHIRCondition, page_size, limit)
+
+    def iter_patient_medications(self, patient_id: str, page_size: int = DEFAULT_PAGE_SIZE,
+                                 limit: Optional[int] = None) -> AsyncIterator[FHIRMedicationRequest]:
+        return self.iter_search("MedicationRequest", {"patient": patient_id}, FHIRMedicationRequest, page_size,
+                                limit)
+
+    async def get_patient_conditions(self, patient_id: str, limit: Optional[int] = None) -> List[FHIRCondition]:
+        return [condition async for condition in self.iter_patient_conditions(patient_id, limit=limit)]
+
+    async def get_patient_medications(self, patient_id: str,
+                                      limit: Optional[int] = None) -> List[FHIRMedicationRequest]:
+        return [medication async for medication in self.iter_patient_medications(patient_id, limit=limit)]
+
+    async def get_patient_summary(self, patient_id: str) -> Optional[FHIRPatientSummary]:
+        resources = None
+        if self.supports_everything is not False:
+            resources = await self._fetch_everything(patient_id)
+        if resources is None:
+            resources = await self._fetch_summary_searches(patient_id)
+        return self._build_summary(patient_id, resources)
+
+    async def _fetch_everything(self, patient_id: str) -> Optional[List[Dict[str, Any]]]:
+        url = f"{self.base_url}/Patient/{patient_id}/$everything"
+        try:
+            resources = [resource async for resource in
+                         self._iter_bundle_resources(url, {"_type": SUMMARY_RESOURCE_TYPES})]
+        except httpx.HTTPStatusError as e:
+            return self._everything_failed(e.response)
+        self.supports_everything = True
+        return resources
+
+    async def _fetch_summary_searches(self, patient_id: str) -> List[Dict[str, Any]]:
+        results = await asyncio.gather(
+            self._search_resources("Patient", {"_id": patient_id}),
+            self._search_resources("Condition", {"patient": patient_id}),
+            self._search_resources("MedicationRequest",
+                                   {"patient": patient_id, "_include": "MedicationRequest:medication"})
+        )
+        return [resource for resources in results for resource in resources]
+
+    async def _search_resources(self, resource_type: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [resource async for resource in
+                self._iter_bundle_resources(f"{self.base_url}/{resource_type}", params)]
+
+    async def get_medication_by_id(self, medication_id: str) -> Optional[FHIRMedication]:
+        cached, _ = self._cached_medications([medication_id])
+        if cached:
+            return cached[medication_id]
+        data = await self._get_json(f"{self.base_url}/Medication/{medication_id}", not_found_ok=True)
+        if data is None:
+            return None
+        medication = FHIRMedication(**data)
+        self._remember_medications({medication_id: medication})
+        return medication
+
+    async def get_medications_by_ids(self, medication_ids: List[str]) -> Dict[str, FHIRMedication]:
+        medications, missing = self._cached_medications(medication_ids)
+        batches = list(_batches(missing, MEDICATION_ID_BATCH_SIZE))
+        for fetched in await asyncio.gather(*(self._fetch_medication_batch(batch) for batch in batches)):
+            medications.update(self._found_medications(fetched))
+        return medications
+
+    async def resolve_medication_references(self, medication_requests: List[FHIRMedicationRequest]
+                                            ) -> Dict[str, FHIRMedication]:
+        medication_ids = [request.medication_id for request in medication_requests]
+        return await self.get_medications_by_ids([medication_id for medication_id in medication_ids if medication_id])
+
+    async def _fetch_medication_batch(self, medication_ids: List[str]) -> Dict[str, Optional[FHIRMedication]]:
+        if self.supports_id_search is not False:
+            fetched = await self._search_medications(medication_ids)
+            if fetched is not None:
+                return fetched
+        # The shared connection pool bounds how many of these reads are in flight
+        medications = await asyncio.gather(*(self.get_medication_by_id(medication_id)
+                                             for medication_id in medication_ids))
+        return dict(zip(medication_ids, medications))
+
+    async def _search_medications(self, medication_ids: List[str]) -> Optional[Dict[str, FHIRMedication]]:
+        try:
+            resources = await self._search_resources("Medication", {"_id": ",".join(medication_ids)})
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in ID_SEARCH_UNSUPPORTED_STATUS_CODES:
+                self.supports_id_search = False
+                return None
+            raise
+        self.supports_id_search = True
+        return self._medications_from_resources(resources, medication_ids)
+
+    async def get_patient_by_id(self, patient_id: str) -> Optional[FHIRPatient]:
+        data = await self._get_json(f"{self.base_url}/Patient/{patient_id}", not_found_ok=True)
+        return FHIRPatient(**data) if data is not None else None
+
+
+FHIR_BASE_URL = "http://localhost:8080/fhir"
+# Shared by the sync and async clients so both see the same cached resources
+fhir_resource_cache = FHIRResourceCache(FHIR_BASE_URL)
+medication_cache = MedicationCache()
+
+
 def get_fhir_client():
     """
     Initialize FHIR client with a fixed base URL.
@@ -109,5 +704,14 @@ def get_fhir_client():
     Returns:
         FHIRClient instance
     """
-    fhir_base_url = "http://localhost:8080/fhir"
-    return FHIRClient(fhir_base_url)
+    return FHIRClient(FHIR_BASE_URL, cache=fhir_resource_cache, medication_cache=medication_cache)
+
+
+def get_async_fhir_client():
+    """
+    Initialize the async FHIR client with a fixed base URL.
+
+    Returns:
+        AsyncFHIRClient instance
+    """
+    return AsyncFHIRClient(FHIR_BASE_URL, cache=fhir_resource_cache, medication_cache=medication_cache)
@@ -1,13 +1,77 @@
-from agents import function_tool
+import asyncio
+from typing import Dict, Optional, Union, Tuple
 
-from labs.aitools.constants import patient_data
-from labs.aitools.tools.fhir.fhir_client import get_fhir_client
+from agents import function_tool, RunContextWrapper
 
-fhir_client = get_fhir_client()
+from labs.aitools.tools.fhir.context import PatientContext, PatientConditionRecord, PatientMedicationRecord, \
+    PatientBiography, PatientConditionsResult, PatientMedicationsResult, PatientBiographyResult, PatientRecord
+from labs.aitools.tools.fhir.fhir_client import get_async_fhir_client
+from labs.aitools.tools.fhir.model import FHIRCondition, FHIRMedication, FHIRMedicationRequest, FHIRPatient, \
+    FHIRPatientSummary
+
+fhir_client = get_async_fhir_client()
+# Summary requests in flight, keyed by session context and patient, shared by concurrent tool calls
+_summary_loads: Dict[Tuple[int, str], asyncio.Future] = {}
+
+
+def _patient_context(ctx: RunContextWrapper) -> PatientContext:
+    # Runs started without a PatientContext still work, they just keep nothing between turns
+    return ctx.context if isinstance(ctx.context, PatientContext) else PatientContext()
+
+
+def _data_version(patient_id: str) -> int:
+    return fhir_client.cache.patient_version(patient_id) if fhir_client.cache else 0
+
+
+async def _load_patient(ctx: RunContextWrapper, patient_id: str, section: str) -> PatientRecord:
+    """
+    The session's record for patient_id, with section loaded and current.
+
+    A stale section reloads the whole patient with one get_patient_summary request, so the
+    conditions, medications and biography tools share it. Tool calls for the same patient made
+    at the same time wait on the one request.
+    """
+    context = _patient_context(ctx)
+    record = context.record(patient_id)
+    if record.is_current(section, _data_version(patient_id)):
+        return record
+
+    key = (id(context), patient_id)
+    load = _summary_loads.get(key)
+    if load is None:
+        load = asyncio.ensure_future(fhir_client.get_patient_summary(patient_id))
+        _summary_loads[key] = load
+        load.add_done_callback(lambda _: _summary_loads.pop(key, None))
+    # Shielded so one cancelled tool call does not cancel the request for the others
+    summary = await asyncio.shield(load)
+    await _store_summary(record, summary)
+    return record
+
+
+async def _store_summary(record: PatientRecord, summary: Optional[FHIRPatientSummary]):
+    data_version = _data_version(record.patient_id)
+    if summary is None:
+        # Unknown patient: no conditions or medications, and no biography to remember
+        record.set_conditions([], data_version)
+        record.set_medications([], data_version)
+        return
+
+    referenced = dict(summary.medications)
+    unresolved = [med for med in summary.medication_requests
+                  if med.display_name is None and med.medication_id and med.medication_id not in referenced]
+    if unresolved:
+        # Servers that do not include referenced Medications get one batch lookup for the rest
+        referenced.update(await fhir_client.resolve_medication_references(unresolved))
+
+    record.set_conditions([_condition_record(condition) for condition in summary.conditions], data_version)
+    record.set_medications([_medication_record(med, referenced) for med in summary.medication_requests],
+                           data_version)
+    record.set_biography(_patient_biography(summary.patient), data_version)
 
 
 @function_tool
-def get_patient_conditions(patient_id: str) -> str:
+async def get_patient_conditions(ctx: RunContextWrapper[PatientContext],
+                                 patient_id: str) -> Union[PatientConditionsResult, str]:
     """
     Retrieve all conditions (diagnoses) for a specific patient from the FHIR server.
 
@@ -15,45 +79,22 @@ def get_patient_conditions(patient_id: str) -> str:
         patient_id: The ID of the patient to retrieve conditions for
 
     Returns:
-        Formatted string with patient conditions
+        Patient conditions, formatted as text by str(), or an error message
     """
     try:
-        conditions = fhir_client.get_patient_conditions(patient_id)
-        if not conditions:
-            return f"No conditions found for patient {patient_id}."
-
-        patient_data["conditions"] = []
-
-        result = f"Found {len(conditions)} conditions for patient {patient_id}:\n"
-        for condition in conditions:
-            display = condition.code.get("text", "Unknown condition")
-            if not display and "coding" in condition.code:
-                for coding in condition.code["coding"]:
-                    if "display" in coding:
-                        display = coding["display"]
-                        break
-
-            status = ""
-            if condition.clinicalStatus and "coding" in condition.clinicalStatus:
-                for coding in condition.clinicalStatus["coding"]:
-                    if "code" in coding:
-                        status = coding["code"]
-                        break
-
-            patient_data["conditions"].append({
-                "name": display,
-                "status": status or "unknown"
-            })
-
-            result += f"- {display} (Status: {status or 'unknown'})\n"
-
-        return result
+        record = await _load_patient(ctx, patient_id, "conditions")
+        return PatientConditionsResult(patient_id=patient_id, conditions=record.conditions)
     except Exception as e:
         return f"Error retrieving conditions: {str(e)}"
 
 
+def _condition_record(condition: FHIRCondition) -> PatientConditionRecord:
+    return PatientConditionRecord(name=condition.display_name, status=condition.clinical_status)
+
+
 @function_tool
-def get_patient_medications(patient_id: str) -> str:
+async def get_patient_medications(ctx: RunContextWrapper[PatientContext],
+                                  patient_id: str) -> Union[PatientMedicationsResult, str]:
     """
     Retrieve all medication requests for a specific patient from the FHIR server.
 
@@ -61,63 +102,27 @@ def get_patient_medications(patient_id: str) -> str:
         patient_id: The ID of the patient to retrieve medications for
 
     Returns:
-        Formatted string with patient medications
+        Patient medications, formatted as text by str(), or an error message
     """
     try:
-        medications = fhir_client.get_patient_medications(patient_id)
-        if not medications:
-            return f"No medications found for patient {patient_id}."
-
-        patient_data["medications"] = []
-
-        result = f"Found {len(medications)} medication requests for patient {patient_id}:\n"
-        for med in medications:
-            med_name = "Unknown medication"
-
-            if med.medicationCodeableConcept:
-                if "text" in med.medicationCodeableConcept:
-                    med_name = med.medicationCodeableConcept["text"]
-                elif "coding" in med.medicationCodeableConcept:
-                    for coding in med.medicationCodeableConcept["coding"]:
-                        if "display" in coding:
-                            med_name = coding["display"]
-                            break
-            elif med.medicationReference:
-                if "reference" in med.medicationReference:
-                    ref = med.medicationReference["reference"]
-                    if ref.startswith("Medication/"):
-                        med_id = ref.split("/")[1]
-                        medication = fhir_client.get_medication_by_id(med_id)
-                        if medication and medication.code:
-                            if "text" in medication.code:
-                                med_name = medication.code["text"]
-                            elif "coding" in medication.code:
-                                for coding in medication.code["coding"]:
-                                    if "display" in coding:
-                                        med_name = coding["display"]
-                                        break
-
-            dosage_info = ""
-            if med.dosageInstruction and len(med.dosageInstruction) > 0:
-                dosage = med.dosageInstruction[0]
-                if "text" in dosage:
-                    dosage_info = dosage["text"]
-
-            patient_data["medications"].append({
-                "name": med_name,
-                "status": med.status,
-                "dosage": dosage_info
-            })
-
-            result += f"- {med_name} (Status: {med.status}){' - Dosage: ' + dosage_info if dosage_info else ''}\n"
-
-        return result
+        record = await _load_patient(ctx, patient_id, "medications")
+        return PatientMedicationsResult(patient_id=patient_id, medications=record.medications)
     except Exception as e:
         return f"Error retrieving medications: {str(e)}"
 
 
+def _medication_record(med: FHIRMedicationRequest, referenced: Dict[str, FHIRMedication]) -> PatientMedicationRecord:
+    med_name = med.display_name
+    if med_name is None:
+        medication = referenced.get(med.medication_id)
+        med_name = medication.display_name if medication else "Unknown medication"
+
+    return PatientMedicationRecord(name=med_name, status=med.status, dosage=med.dosage_text)
+
+
 @function_tool
-def get_patient_biography(patient_id: str) -> str:
+async def get_patient_biography(ctx: RunContextWrapper[PatientContext],
+                                patient_id: str) -> Union[PatientBiographyResult, str]:
     """
     Retrieve biographical information for a specific patient from the FHIR server.
 
@@ -125,77 +130,48 @@ def get_patient_biography(patient_id: str) -> str:
         patient_id: The ID of the patient to retrieve information for
 
     Returns:
-        Formatted string with patient biographical information
+        Patient biographical information, formatted as text by str(), or an error message
     """
     try:
-        patient = fhir_client.get_patient_by_id(patient_id)
-        if not patient:
-            return f"No patient found with ID {patient_id}."
-
-        patient_data["biography"] = {}
-
-        name = "Unknown"
-        if patient.name and len(patient.name) > 0:
-            name_parts = []
-            if "given" in patient.name[0] and patient.name[0]["given"]:
-                name_parts.extend(patient.name[0]["given"])
-            if "family" in patient.name[0]:
-                name_parts.append(patient.name[0]["family"])
-            if name_parts:
-                name = " ".join(name_parts)
-
-        address = "Not available"
-        if patient.address and len(patient.address) > 0:
-            addr_parts = []
-            addr = patient.address[0]
-            if "line" in addr and addr["line"]:
-                addr_parts.extend(addr["line"])
-            if "city" in addr:
-                addr_parts.append(addr["city"])
-            if "state" in addr:
-                addr_parts.append(addr["state"])
-            if "postalCode" in addr:
-                addr_parts.append(addr["postalCode"])
-            if "country" in addr:
-                addr_parts.append(addr["country"])
-            if addr_parts:
-                address = ", ".join(addr_parts)
-
-        contact = "Not available"
-        if patient.telecom and len(patient.telecom) > 0:
-            contact_parts = []
-            for telecom in patient.telecom:
-                if "system" in telecom and "value" in telecom:
-                    contact_parts.append(f"{telecom['system']}: {telecom['value']}")
-            if contact_parts:
-                contact = ", ".join(contact_parts)
-
-        marital_status = "Not available"
-        if patient.maritalStatus and "coding" in patient.maritalStatus:
-            for coding in patient.maritalStatus["coding"]:
-                if "display" in coding:
-                    marital_status = coding["display"]
-                    break
-
-        patient_data["biography"] = {
-            "name": name,
-            "id": patient.id,
-            "gender": patient.gender or "Not specified",
-            "birthDate": patient.birthDate or "Not available",
-            "maritalStatus": marital_status,
-            "address": address,
-            "contact": contact
-        }
-
-        result = f"Patient Information:\n"
-        result += f"- Name: {name}\n"
-        result += f"- ID: {patient.id}\n"
-        result += f"- Gender: {patient.gender or 'Not specified'}\n"
-        result += f"- Birth Date: {patient.birthDate or 'Not available'}\n"
-        result += f"- Marital Status: {marital_status}\n"
-        result += f"- Address: {address}\n"
-        result += f"- Contact: {contact}\n"
-
-        return result
+        record = await _load_patient(ctx, patient_id, "biography")
+        return PatientBiographyResult(patient_id=patient_id, biography=record.biography)
     except Exception as e:
         return f"Error retrieving patient information: {str(e)}"
+
+
+def _patient_biography(patient: FHIRPatient) -> PatientBiography:
+    address = "Not available"
+    if patient.address and len(patient.address) > 0:
+        addr_parts = []
+        addr = patient.address[0]
+        if "line" in addr and addr["line"]:
+            addr_parts.extend(addr["line"])
+        if "city" in addr:
+            addr_parts.append(addr["city"])
+        if "state" in addr:
+            addr_parts.append(addr["state"])
+        if "postalCode" in addr:
+            addr_parts.append(addr["postalCode"])
+        if "country" in addr:
+            addr_parts.append(addr["country"])
+        if addr_parts:
+            address = ", ".join(addr_parts)
+
+    contact = "Not available"
+    if patient.telecom and len(patient.telecom) > 0:
+        contact_parts = []
+        for telecom in patient.telecom:
+            if "system" in telecom and "value" in telecom:
+                contact_parts.append(f"{telecom['system']}: {telecom['value']}")
+        if contact_parts:
+            contact = ", ".join(contact_parts)
+
+    return PatientBiography(
+        name=patient.display_name,
+        id=patient.id,
+        gender=patient.gender or "Not specified",
+        birthDate=patient.birthDate or "Not available",
+        maritalStatus=patient.marital_status or "Not available",
+        address=address,
+        contact=contact
+    )
@@ -1,10 +1,40 @@
-from pydantic import BaseModel, Field as PydanticField
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field as PydanticField, PrivateAttr
+from typing import Optional, List, Dict, Any, NamedTuple, Tuple
+
+
+class FHIRCoding(NamedTuple):
+    """A single coding of a CodeableConcept."""
+    system: Optional[str]
+    code: Optional[str]
+    display: Optional[str]
+
+
+def concept_codings(concept: Optional[Dict[str, Any]]) -> Tuple[FHIRCoding, ...]:
+    if not concept:
+        return ()
+    return tuple(FHIRCoding(coding.get("system"), coding.get("code"), coding.get("display"))
+                 for coding in concept.get("coding", []))
+
+
+def concept_display(concept: Optional[Dict[str, Any]], codings: Tuple[FHIRCoding, ...]) -> Optional[str]:
+    """A CodeableConcept's text, else the display of its first coding that has one."""
+    if concept and concept.get("text"):
+        return concept["text"]
+    for coding in codings:
+        if coding.display:
+            return coding.display
+    return None
+
+
+def _first_code(concept: Optional[Dict[str, Any]]) -> Optional[str]:
+    for coding in concept_codings(concept):
+        if coding.code:
+            return coding.code
+    return None
 
 
 class FHIRCondition(BaseModel):
     """
-    TODO:
     Pydantic model representing a FHIR Condition resource.
     Contains information about a patient's diagnosed condition or problem.
 
@@ -15,13 +45,43 @@ class FHIRCondition(BaseModel):
     - clinicalStatus: Optional dictionary with status codes (active, resolved, etc)
     - verificationStatus: Optional dictionary with verification state (confirmed, provisional, etc) 
     - onsetDateTime: Optional string containing when the condition began
+
+    Derived once at parse time:
+    - display_name: Code text or first coding display, "Unknown condition" if neither is present
+    - clinical_status: First clinicalStatus code, "unknown" if not present
+    - codings: Codings of code
     """
+    id: str
+    code: Dict[str, Any] = PydanticField(default_factory=dict)
+    subject: Dict[str, Any]
+    clinicalStatus: Optional[Dict[str, Any]] = None
+    verificationStatus: Optional[Dict[str, Any]] = None
+    onsetDateTime: Optional[str] = None
+
+    _display_name: str = PrivateAttr("Unknown condition")
+    _clinical_status: str = PrivateAttr("unknown")
+    _codings: Tuple[FHIRCoding, ...] = PrivateAttr(())
+
+    def model_post_init(self, __context: Any):
+        self._codings = concept_codings(self.code)
+        self._display_name = concept_display(self.code, self._codings) or "Unknown condition"
+        self._clinical_status = _first_code(self.clinicalStatus) or "unknown"
+
+    @property
+    def display_name(self) -> str:
+        return self._display_name
 
+    @property
+    def clinical_status(self) -> str:
+        return self._clinical_status
+
+    @property
+    def codings(self) -> Tuple[FHIRCoding, ...]:
+        return self._codings
 
 
 class FHIRMedication(BaseModel):
     """
-    TODO:
     Pydantic model representing a FHIR Medication resource.
     Contains information about a medication, including its code and status.
 
@@ -29,13 +89,33 @@ class FHIRMedication(BaseModel):
     - id: Unique identifier for the medication
     - code: Dictionary containing the medication code and coding system info
     - status: String indicating if medication is active, inactive, etc
+
+    Derived once at parse time:
+    - display_name: Code text or first coding display, "Unknown medication" if neither is present
+    - codings: Codings of code
     """
+    id: str
+    code: Dict[str, Any] = PydanticField(default_factory=dict)
+    status: Optional[str] = None
+
+    _display_name: str = PrivateAttr("Unknown medication")
+    _codings: Tuple[FHIRCoding, ...] = PrivateAttr(())
 
+    def model_post_init(self, __context: Any):
+        self._codings = concept_codings(self.code)
+        self._display_name = concept_display(self.code, self._codings) or "Unknown medication"
+
+    @property
+    def display_name(self) -> str:
+        return self._display_name
+
+    @property
+    def codings(self) -> Tuple[FHIRCoding, ...]:
+        return self._codings
 
 
 class FHIRMedicationRequest(BaseModel):
     """
-    TODO:
     Pydantic model representing a FHIR MedicationRequest resource.
     Contains information about a medication prescription, including dosage instructions.
 
@@ -48,13 +128,59 @@ class FHIRMedicationRequest(BaseModel):
     - medicationReference: Optional dictionary with reference to medication resource
     - authoredOn: Optional string containing when request was created
     - dosageInstruction: Optional list of dictionaries with dosing details
-    """
 
+    Derived once at parse time:
+    - display_name: medicationCodeableConcept text or first coding display, None when the
+      medication is only referenced
+    - medication_id: Id of the referenced Medication, None when the medication is given inline
+    - dosage_text: Text of the first dosage instruction, empty if not given
+    - codings: Codings of medicationCodeableConcept
+    """
+    id: str
+    status: str
+    intent: str
+    subject: Dict[str, Any]
+    medicationCodeableConcept: Optional[Dict[str, Any]] = None
+    medicationReference: Optional[Dict[str, Any]] = None
+    authoredOn: Optional[str] = None
+    dosageInstruction: Optional[List[Dict[str, Any]]] = None
+
+    _display_name: Optional[str] = PrivateAttr(None)
+    _medication_id: Optional[str] = PrivateAttr(None)
+    _dosage_text: str = PrivateAttr("")
+    _codings: Tuple[FHIRCoding, ...] = PrivateAttr(())
+
+    def model_post_init(self, __context: Any):
+        self._codings = concept_codings(self.medicationCodeableConcept)
+        if self.medicationCodeableConcept:
+            self._display_name = concept_display(self.medicationCodeableConcept, self._codings) or \
+                                 "Unknown medication"
+        elif self.medicationReference:
+            reference = self.medicationReference.get("reference", "")
+            if reference.startswith("Medication/"):
+                self._medication_id = reference.split("/")[1]
+        if self.dosageInstruction:
+            self._dosage_text = self.dosageInstruction[0].get("text", "")
+
+    @property
+    def display_name(self) -> Optional[str]:
+        return self._display_name
+
+    @property
+    def medication_id(self) -> Optional[str]:
+        return self._medication_id
+
+    @property
+    def dosage_text(self) -> str:
+        return self._dosage_text
+
+    @property
+    def codings(self) -> Tuple[FHIRCoding, ...]:
+        return self._codings
 
 
 class FHIRPatient(BaseModel):
     """
-    TODO:
     Pydantic model representing a FHIR Patient resource.
     Contains demographic and contact information about a patient.
 
@@ -66,5 +192,54 @@ class FHIRPatient(BaseModel):
     - address: Optional list of dictionaries with address details
     - telecom: Optional list of dictionaries with contact info (phone, email)
     - maritalStatus: Optional dictionary with marital status codes
+
+    Derived once at parse time:
+    - display_name: Given and family names of the first name, "Unknown" if empty
+    - marital_status: First maritalStatus coding display, None if not present
+    """
+    id: str
+    name: List[Dict[str, Any]] = PydanticField(default_factory=list)
+    gender: Optional[str] = None
+    birthDate: Optional[str] = None
+    address: Optional[List[Dict[str, Any]]] = None
+    telecom: Optional[List[Dict[str, Any]]] = None
+    maritalStatus: Optional[Dict[str, Any]] = None
+
+    _display_name: str = PrivateAttr("Unknown")
+    _marital_status: Optional[str] = PrivateAttr(None)
+
+    def model_post_init(self, __context: Any):
+        if self.name:
+            name_parts = list(self.name[0].get("given") or [])
+            if self.name[0].get("family"):
+                name_parts.append(self.name[0]["family"])
+            if name_parts:
+                self._display_name = " ".join(name_parts)
+        for coding in concept_codings(self.maritalStatus):
+            if coding.display:
+                self._marital_status = coding.display
+                break
+
+    @property
+    def display_name(self) -> str:
+        return self._display_name
+
+    @property
+    def marital_status(self) -> Optional[str]:
+        return self._marital_status
+
+
+class FHIRPatientSummary(BaseModel):
     """
+    Consolidated snapshot of a patient's record returned by FHIRClient.get_patient_summary.
 
+    Fields:
+    - patient: The patient's FHIRPatient resource
+    - conditions: The patient's FHIRCondition resources
+    - medication_requests: The patient's FHIRMedicationRequest resources
+    - medications: FHIRMedication resources referenced by the medication requests, keyed by id
+    """
+    patient: FHIRPatient
+    conditions: List[FHIRCondition] = PydanticField(default_factory=list)
+    medication_requests: List[FHIRMedicationRequest] = PydanticField(default_factory=list)
+    medications: Dict[str, FHIRMedication] = PydanticField(default_factory=dict)
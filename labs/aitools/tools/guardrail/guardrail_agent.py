@@ -1,9 +1,23 @@
-from agents import OpenAIChatCompletionsModel, Agent, RunContextWrapper, GuardrailFunctionOutput, Runner
-from openai import AsyncOpenAI
+import asyncio
+import re
+from contextlib import aclosing
+from typing import Any, List, AsyncIterator, Callable, Optional
 
-from labs.aitools.constants import openai_api_key
+from agents import OpenAIChatCompletionsModel, Agent, RunContextWrapper, GuardrailFunctionOutput, Runner, \
+    InputGuardrailTripwireTriggered, InputGuardrailResult
+
+from labs.aitools.tools.agent_registry import get_agent, stream_text
 from labs.aitools.tools.guardrail.model import MedicalQueryOutput
 
+# Words that make a query medical without asking the guardrail model. Only specific medical
+# terms belong here: generic ones like "patient" or "clinical" fit off-topic prompts too
+MEDICAL_KEYWORDS = frozenset({
+    "medication", "medications", "medicine", "medicines", "prescription", "prescriptions", "prescribed",
+    "dosage", "diagnosis", "diagnoses", "diagnosed", "symptom", "symptoms", "disease", "diseases", "allergy",
+    "allergies", "icd", "snomed", "rxnorm", "diabetes", "hypertension", "asthma", "infection", "cancer",
+    "metformin", "insulin", "lisinopril"
+})
+
 
 def create_guardrail_agent(use_openai=False):
     """
@@ -17,24 +31,13 @@ def create_guardrail_agent(use_openai=False):
       {"is_medical_query": true, "reasoning": "The query mentions symptoms or treatments."}
     Otherwise, it returns:
       {"is_medical_query": false, "reasoning": "The query is non-medical."}
+
+    The agent is built once per process and model and shared by every caller.
     """
-    if use_openai:
-        model = OpenAIChatCompletionsModel(
-            model="gpt-4o-mini",
-            openai_client=AsyncOpenAI(
-                base_url="https://api.openai.com/v1",
-                api_key=openai_api_key
-            )
-        )
-    else:
-        model = OpenAIChatCompletionsModel(
-            model="llama3.2",
-            openai_client=AsyncOpenAI(
-                base_url="http://localhost:11434/v1",
-                api_key="dummy-key"  # Ollama doesn't check API keys, but the client requires one
-            )
-        )
+    return get_agent("guardrail", use_openai, _build_guardrail_agent)
+
 
+def _build_guardrail_agent(model: OpenAIChatCompletionsModel) -> Agent:
     instructions = (
         "Check if the user's query is related to medical information or healthcare data. "
         "Return a JSON object with exactly two keys: 'is_medical_query' (a boolean) and 'reasoning' (a string). "
@@ -52,6 +55,17 @@ def create_guardrail_agent(use_openai=False):
     )
 
 
+def is_obviously_medical(input_data: Any) -> bool:
+    """
+    Cheap local check run before the guardrail model.
+
+    Only a positive answer is trusted; every other query still goes to the guardrail model.
+    """
+    if not isinstance(input_data, str):
+        return False
+    return any(word in MEDICAL_KEYWORDS for word in re.findall(r"[a-z0-9]+", input_data.lower()))
+
+
 async def medical_query_guardrail(ctx: RunContextWrapper, agent: Agent, input_data: str) -> GuardrailFunctionOutput:
     """
     Guardrail function to determine if a query is medical-related.
@@ -64,6 +78,12 @@ async def medical_query_guardrail(ctx: RunContextWrapper, agent: Agent, input_da
     Returns:
         GuardrailFunctionOutput with evaluation results and whether the tripwire was triggered
     """
+    if is_obviously_medical(input_data):
+        return GuardrailFunctionOutput(
+            output_info=MedicalQueryOutput(is_medical_query=True, reasoning="The query uses medical terms."),
+            tripwire_triggered=False,
+        )
+
     guardrail_agent = create_guardrail_agent(use_openai=True)
     result = await Runner.run(guardrail_agent, input_data, context=ctx.context)
     final_output = result.final_output_as(MedicalQueryOutput)
@@ -75,3 +95,55 @@ async def medical_query_guardrail(ctx: RunContextWrapper, agent: Agent, input_da
         output_info=final_output,
         tripwire_triggered=not is_medical,
     )
+
+
+async def stream_with_optimistic_guardrails(agent: Agent, input_data: str, context: Any = None,
+                                            on_tool_output: Optional[Callable[[Any], None]] = None) -> AsyncIterator[str]:
+    """
+    Run an agent and its input guardrails side by side, yielding the agent's text as it is generated.
+
+    The agent starts straight away without its guardrails, which are checked alongside it. If a
+    tripwire fires the run is cancelled, including any tool calls in progress. Text generated
+    before every guardrail has passed is held back and yielded at once when they do, so nothing
+    is shown for a query that is then rejected.
+
+    Args:
+        agent: The agent to run
+        input_data: The user's input query
+        context: The run context passed to the agent and the guardrails
+        on_tool_output: Called with the object each of the agent's tool calls returns
+
+    Raises:
+        InputGuardrailTripwireTriggered: If a guardrail rejects the input
+    """
+    if not agent.input_guardrails:
+        async with aclosing(stream_text(agent, input_data, context=context, on_tool_output=on_tool_output)) as texts:
+            async for text in texts:
+                yield text
+        return
+
+    guardrails_task = asyncio.create_task(_check_input_guardrails(agent, input_data, context))
+    try:
+        async with aclosing(stream_text(agent.clone(input_guardrails=[]), input_data, context=context,
+                                        gate=guardrails_task, on_tool_output=on_tool_output)) as texts:
+            async for text in texts:
+                yield text
+    finally:
+        guardrails_task.cancel()
+
+
+async def _check_input_guardrails(agent: Agent, input_data: str, context: Any) -> List[InputGuardrailResult]:
+    context_wrapper = RunContextWrapper(context=context)
+    guardrail_tasks = [asyncio.create_task(guardrail.run(agent, input_data, context_wrapper))
+                       for guardrail in agent.input_guardrails]
+    try:
+        guardrail_results = []
+        for done in asyncio.as_completed(guardrail_tasks):
+            guardrail_result = await done
+            if guardrail_result.output.tripwire_triggered:
+                raise InputGuardrailTripwireTriggered(guardrail_result)
+            guardrail_results.append(guardrail_result)
+        return guardrail_results
+    finally:
+        for task in guardrail_tasks:
+            task.cancel()
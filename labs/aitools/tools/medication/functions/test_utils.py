@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("agents")
+
+from labs.aitools.tools.medication.functions import utils
+from lof.cache import FDBDrugCache
+from lof.services import AsyncFDBService, _drug_info_from_response
+
+
+class MonographResponse:
+    status_code = 200
+
+    def json(self):
+        return {
+            "title": "Metformin Oral",
+            "content": {
+                "uses": "Metformin is used to control high blood sugar.",
+                "instructions": "Take this medication by mouth with meals.",
+                "cautions": ["Tell your doctor if you have kidney disease.",
+                             "Avoid alcohol while taking this medication."],
+                "sideEffects": ["Nausea", "Diarrhea"],
+                "extra": "",
+                "disclaimer": "Consult your doctor."
+            }
+        }
+
+
+def test_prefetched_monograph_is_formatted_in_full(monkeypatch):
+    cache = FDBDrugCache(":memory:")
+    cache.put("metformin", "fdb-1", _drug_info_from_response(MonographResponse()))
+    monkeypatch.setattr(utils, "fdb_service", AsyncFDBService(cache=cache))
+
+    monographs = asyncio.run(utils.fetch_medication_info(["metformin"]))
+    formatted = utils.format_medication_info("metformin", monographs["metformin"])
+
+    assert "- Name: Metformin Oral" in formatted
+    assert "- Uses: Metformin is used to control high blood sugar." in formatted
+    assert "- Instructions: Take this medication by mouth with meals." in formatted
+    assert "  * Tell your doctor if you have kidney disease." in formatted
+    assert "  * Avoid alcohol while taking this medication." in formatted
+    assert "  * Nausea" in formatted
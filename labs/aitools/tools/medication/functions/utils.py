@@ -1,54 +1,204 @@
+import asyncio
+import os
+import threading
+from typing import List, Dict, Any, Tuple, FrozenSet, Optional
+
 from agents import function_tool
 
-from lof.services import FDBService
+from labs.aitools.tools.enhancer.functions.utils import imo_normalizer
+from labs.aitools.tools.response_cache import tool_result_cache
+from lof.cache import FDBDrugCache
+from lof.drug_index import DRUG_INDEX_PATH, DrugIndex, Indication, Interaction, entity_keys, \
+    normalized_entity_keys
+from lof.services import AsyncFDBService
 
-@function_tool
-def get_medication_info_from_fdb(drug_name: str) -> str:
+fdb_service = AsyncFDBService(cache=FDBDrugCache())
+
+_drug_index: Optional[DrugIndex] = None
+_drug_index_mtime: Optional[float] = None
+_drug_index_lock = threading.Lock()
+
+# FDB lookups in flight at once for a batch of drugs
+FDB_LOOKUP_CONCURRENCY = 4
+
+
+async def fetch_medication_info(drug_names: List[str]) -> Dict[str, Any]:
     """
-    Get detailed medication information from FDB (First Databank) database.
+    Look up several drugs in FDB concurrently, at most FDB_LOOKUP_CONCURRENCY at a time.
 
     Args:
-        drug_name: Name of the medication to look up
+        drug_names: Names of the medications to look up, duplicates allowed
 
     Returns:
-        Formatted string with medication information from FDB
+        Dict keyed by drug name of the FDB result, None if FDB has no match, or the exception
+        raised by the lookup
+    """
+    semaphore = asyncio.Semaphore(FDB_LOOKUP_CONCURRENCY)
+
+    async def lookup(drug_name):
+        async with semaphore:
+            try:
+                return await fdb_service.get_drug_info(drug_name)
+            except Exception as e:
+                return e
+
+    unique_names = list(dict.fromkeys(drug_names))
+    results = await asyncio.gather(*(lookup(drug_name) for drug_name in unique_names))
+    return dict(zip(unique_names, results))
+
+
+def get_drug_index(path: str = DRUG_INDEX_PATH) -> DrugIndex:
+    """
+    The local drug index, built offline with `python -m lof.cache build-drug-index`.
+
+    Loaded on first use and reloaded whenever a rebuild changes the file, so a running app picks
+    up a new index without restarting. Empty while the index has not been built.
     """
+    global _drug_index, _drug_index_mtime
     try:
-        fdb_service = FDBService()
-        result = fdb_service.get_drug_info(drug_name)
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _drug_index_lock:
+        if _drug_index is None or mtime != _drug_index_mtime:
+            _drug_index = DrugIndex.load(path)
+            _drug_index_mtime = mtime
+        return _drug_index
+
+
+async def _index_keys(names: List[str], domain: str) -> Dict[str, FrozenSet[str]]:
+    async def keys(name):
+        try:
+            return normalized_entity_keys(name, await imo_normalizer.normalize(name, domain))
+        except Exception:
+            return entity_keys(name)
+
+    unique_names = list(dict.fromkeys(names))
+    return dict(zip(unique_names, await asyncio.gather(*(keys(name) for name in unique_names))))
+
+
+async def find_indexed_relationships(conditions: List[str],
+                                     medications: List[str]) -> Tuple[List[Indication], List[Interaction]]:
+    """
+    Look up every medication-condition and medication-medication pair in the local drug index.
+
+    Names are IMO normalized, batched into one request per domain, to get the codes the index
+    is keyed by. Each pair is then a constant-time lookup.
+
+    Args:
+        conditions: Names of the patient's conditions
+        medications: Names of the patient's medications
+
+    Returns:
+        (indications, interactions) found in the index
+    """
+    drug_index = get_drug_index()
+    if not len(drug_index) or not medications:
+        return [], []
+
+    condition_keys, medication_keys = await asyncio.gather(
+        _index_keys(conditions, "problem"), _index_keys(medications, "medication")
+    )
+
+    indications = []
+    for medication in medication_keys.values():
+        for condition in condition_keys.values():
+            indications.extend(drug_index.indications(medication, condition))
 
-        if not result or "error" in result:
-            return f"No information found in FDB for medication: {drug_name}"
+    interactions = []
+    medication_key_sets = list(medication_keys.values())
+    for i, medication in enumerate(medication_key_sets):
+        for other in medication_key_sets[i + 1:]:
+            interactions.extend(drug_index.interactions(medication, other))
 
-        formatted_result = f"FDB Information for {drug_name}:\n"
+    return list(dict.fromkeys(indications)), list(dict.fromkeys(interactions))
 
-        if "title" in result:
-            formatted_result += f"- Name: {result['title']}\n"
 
-        if "uses" in result:
-            formatted_result += f"- Uses: {result['uses']}\n"
+def format_indexed_relationships(indications: List[Indication], interactions: List[Interaction]) -> str:
+    """Format facts found by find_indexed_relationships as markdown bullet lists."""
+    if not indications and not interactions:
+        return "No indications or interactions for these medications were found in the local drug index."
 
-        if "description" in result:
-            formatted_result += f"- response['content']['instructions']: {result['description']}\n"
+    formatted_result = ""
+    if indications:
+        formatted_result += "Indications:\n"
+        for indication in indications:
+            formatted_result += f"- {indication.drug} is used for {indication.condition} (FDB: \"{indication.evidence}\")\n"
 
-        if "contraindications" in result and result["contraindications"]:
-            formatted_result += "- Contraindications:\n"
-            for contraindication in result["contraindications"]:
-                formatted_result += f"  * {contraindication}\n"
+    if interactions:
+        formatted_result += "Interactions:\n"
+        for interaction in interactions:
+            formatted_result += f"- {interaction.drug} and {interaction.other_drug} (FDB: \"{interaction.evidence}\")\n"
 
-        if "side_effects" in result and result["side_effects"]:
-            formatted_result += "- Common Side Effects:\n"
-            for effect in result["side_effects"]:
-                formatted_result += f"  * {effect}\n"
+    return formatted_result
 
-        if "dosage" in result:
-            formatted_result += f"- Typical Dosage: {result['dosage']}\n"
 
-        if "interactions" in result and result["interactions"]:
-            formatted_result += "- Drug Interactions:\n"
-            for interaction in result["interactions"]:
-                formatted_result += f"  * {interaction}\n"
+def _format_section(label: str, value: Any) -> str:
+    """A monograph section as one line, or as a bulleted list when FDB returns several entries."""
+    if not value:
+        return ""
+    if isinstance(value, str):
+        return f"- {label}: {value}\n"
+    formatted_section = f"- {label}:\n"
+    for entry in value:
+        formatted_section += f"  * {entry}\n"
+    return formatted_section
 
-        return formatted_result
+
+def format_medication_info(drug_name: str, result: Any) -> str:
+    """
+    Format an FDB lookup result, as returned by fetch_medication_info, for an agent.
+
+    Reads the monograph keys returned by FDBService.get_drug_info.
+    """
+    if isinstance(result, Exception):
+        return f"Error retrieving FDB information for {drug_name}: {str(result)}"
+
+    if not result or "error" in result:
+        return f"No information found in FDB for medication: {drug_name}"
+
+    formatted_result = f"FDB Information for {drug_name}:\n"
+    formatted_result += _format_section("Name", result.get("name"))
+    formatted_result += _format_section("Uses", result.get("uses"))
+    formatted_result += _format_section("Instructions", result.get("instructions"))
+    formatted_result += _format_section("Cautions", result.get("caution"))
+    formatted_result += _format_section("Common Side Effects", result.get("side_effects"))
+    formatted_result += _format_section("Additional Information", result.get("extra"))
+
+    return formatted_result
+
+
+@function_tool
+@tool_result_cache.memoize
+async def get_medication_info_from_fdb(drug_name: str) -> str:
+    """
+    Get detailed medication information from FDB (First Databank) database.
+
+    Args:
+        drug_name: Name of the medication to look up
+
+    Returns:
+        Formatted string with medication information from FDB
+    """
+    try:
+        result = await fdb_service.get_drug_info(drug_name)
     except Exception as e:
-        return f"Error retrieving FDB information for {drug_name}: {str(e)}"
\ No newline at end of file
+        result = e
+    return format_medication_info(drug_name, result)
+
+
+@function_tool
+async def get_medication_info_batch(drug_names: List[str]) -> str:
+    """
+    Get FDB (First Databank) information for several medications at once.
+
+    Prefer this over calling get_medication_info_from_fdb once per medication.
+
+    Args:
+        drug_names: Names of the medications to look up
+
+    Returns:
+        Formatted string with FDB information for each medication
+    """
+    results = await fetch_medication_info(drug_names)
+    return "\n".join(format_medication_info(drug_name, result) for drug_name, result in results.items())
@@ -1,8 +1,7 @@
 from agents import OpenAIChatCompletionsModel, Agent
-from openai import AsyncOpenAI
 
-from labs.aitools.constants import openai_api_key
-from labs.aitools.tools.medication.functions.utils import get_medication_info_from_fdb
+from labs.aitools.tools.agent_registry import get_agent
+from labs.aitools.tools.medication.functions.utils import get_medication_info_from_fdb, get_medication_info_batch
 from labs.aitools.tools.search.functions.utils import search_duckduckgo
 
 
@@ -10,60 +9,48 @@ def create_medication_matcher_agent(use_openai=False):
     """
     Create an agent that matches medications to conditions.
 
+    The agent is built once per process and model and shared by every caller.
+
     Args:
         use_openai: Boolean flag to use OpenAI instead of Ollama
 
     Returns:
         Agent instance configured to match medications to conditions
     """
-    if use_openai:
-        model = OpenAIChatCompletionsModel(
-            model="gpt-4o-mini",
-            openai_client=AsyncOpenAI(
-                base_url="https://api.openai.com/v1",
-                api_key=openai_api_key
-            )
-        )
-    else:
-        model = OpenAIChatCompletionsModel(
-            model="llama3.2",
-            openai_client=AsyncOpenAI(
-                base_url="http://localhost:11434/v1",
-                api_key="dummy-key"  # Ollama doesn't check API keys, but OpenAI client requires one
-            )
-        )
+    return get_agent("medication_matcher", use_openai, _build_medication_matcher_agent)
 
-    """
-    TODO:
-    Instructions for creating matcher_agent_instructions:
-    1. Define the agent's role as a specialized healthcare assistant for medication matching
-    2. Specify the data retrieval and analysis workflow:
-       - Use FDB database for medication information
-       - Use search for supplementary condition information
-       - Analyze medication-condition relationships
-    3. Set analysis requirements:
-       - Match medications to conditions
-       - Identify use cases
-       - Check for interactions
-    4. Define output format:
-       - Present findings in tables
-       - Include reasoning
-       - Note uncertainties
-       - Cite FDB sources
-    """
+
+def _build_medication_matcher_agent(model: OpenAIChatCompletionsModel) -> Agent:
     matcher_agent_instructions = """
+        You are a healthcare assistant specialized in matching a patient's medications to their conditions.
+
+        Workflow:
+        - FDB information for the patient's medications is usually included with the request; use it
+          rather than looking those medications up again.
+        - Relationships found in the local drug index are also included. They come straight from FDB
+          monographs: treat them as established, explain them, and do not look them up again.
+        - Look up any other medications in the FDB database, with get_medication_info_batch for several
+          at once or get_medication_info_from_fdb for a single one.
+        - Use search_duckduckgo for supplementary information about the conditions.
+        - Analyze how the medications relate to the conditions.
+
+        Analysis:
+        - Match each medication to the conditions it treats, starting from the indexed indications and
+          reasoning only about the pairs the index does not cover.
+        - Identify the use of each medication.
+        - Check for interactions between the medications.
+
+        Output:
+        - Present the findings in tables.
+        - Include the reasoning for each match.
+        - Note any uncertainties.
+        - Cite FDB as the source of medication information.
         """
 
-    """
-    TODO:
-    Instructions for creating Medication Matcher Agent:
-    1. Set agent name as "Medication Condition Matcher"
-    2. Use the detailed instructions defined above
-    3. Configure required tools:
-       - get_medication_info_from_fdb: Retrieves medication data
-       - search_duckduckgo: Provides condition information
-    4. Set output type to string for formatted results
-    5. Use the specified language model
-    """
-    matcher = None
-    return matcher
+    return Agent(
+        name="Medication Condition Matcher",
+        instructions=matcher_agent_instructions,
+        tools=[get_medication_info_batch, get_medication_info_from_fdb, search_duckduckgo],
+        output_type=str,
+        model=model
+    )
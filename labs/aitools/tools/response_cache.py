@@ -0,0 +1,212 @@
+import functools
+import inspect
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Tuple
+
+from agents import RunContextWrapper
+
+from labs.aitools.tools.fhir.fhir_client import fhir_resource_cache, get_fhir_client
+
+# LoF and search lookups change rarely; answers also depend on the model and are kept shorter
+TOOL_RESULT_TTL_SECONDS = 3600
+TOOL_RESULT_MAX_ENTRIES = 1024
+ANSWER_TTL_SECONDS = 600
+ANSWER_MAX_ENTRIES = 256
+SEARCH_RESULT_TTL_SECONDS = 3600
+SEARCH_RESULT_MAX_ENTRIES = 1024
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-fold and collapse whitespace and trailing punctuation, so trivially different prompts share a key."""
+    return re.sub(r"\s+", " ", prompt).strip().rstrip("?.!").strip().casefold()
+
+
+class _TTLCache:
+    """Thread-safe LRU of values that expire ttl_seconds after they are stored."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key, is_valid: Optional[Callable[[Any], bool]] = None) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] > self.ttl_seconds or \
+                    (is_valid is not None and not is_valid(entry[0])):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def _put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class ToolResultCache(_TTLCache):
+    """
+    Memoizes async agent tool results, keyed by tool name and arguments.
+
+    Shared across sessions, so a drug looked up or a term normalized for one question is not
+    fetched again when another agent run asks for it. Error results are never stored.
+    """
+
+    def __init__(self, ttl_seconds: float = TOOL_RESULT_TTL_SECONDS, max_entries: int = TOOL_RESULT_MAX_ENTRIES):
+        super().__init__(ttl_seconds, max_entries)
+
+    def memoize(self, func: Callable) -> Callable:
+        """
+        Decorator for tool functions, applied beneath @function_tool.
+
+        String arguments are compared case-insensitively and RunContextWrapper arguments are
+        left out of the key.
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = self._key(func.__name__, signature.bind(*args, **kwargs).arguments)
+            hit, result = self._get(key)
+            if hit:
+                return result
+            result = await func(*args, **kwargs)
+            if not (isinstance(result, str) and result.startswith("Error")):
+                self._put(key, result)
+            return result
+
+        return wrapper
+
+    @staticmethod
+    def _key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        values = {}
+        for name, value in arguments.items():
+            if isinstance(value, RunContextWrapper):
+                continue
+            values[name] = " ".join(value.split()).casefold() if isinstance(value, str) else value
+        return tool_name, json.dumps(values, sort_keys=True, default=str)
+
+
+class AnswerCache(_TTLCache):
+    """
+    Final assistant answers keyed by normalized prompt, patient and model.
+
+    Each answer remembers the patient it was about and that patient's FHIR data version when it
+    was produced. Serving a cached answer makes no tool calls, so before one is served the
+    patient's cached FHIR requests are revalidated with conditional GETs, and the answer is
+    dropped if that moves the data version on. Answers whose FHIR data is no longer cached, or
+    cannot be revalidated in time, are not served.
+    """
+
+    def __init__(self, ttl_seconds: float = ANSWER_TTL_SECONDS, max_entries: int = ANSWER_MAX_ENTRIES,
+                 data_version: Callable[[str], int] = fhir_resource_cache.patient_version,
+                 revalidate: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            data_version: Returns a patient's FHIR data version
+            revalidate: Revalidates a patient's cached FHIR requests, returning how many there were.
+                        Defaults to the shared FHIR client's revalidate_patient, looked up on first use
+        """
+        super().__init__(ttl_seconds, max_entries)
+        self.data_version = data_version
+        self.revalidate = revalidate
+
+    def get(self, prompt: str, patient_id: Optional[str], model: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Args:
+            prompt: The user's prompt
+            patient_id: Patient the session was on when the prompt was asked, if any
+            model: Name of the model answering
+
+        Returns:
+            (answer, patient id the answer is about) or None on a miss
+        """
+        key = (normalize_prompt(prompt), patient_id, model)
+        hit, entry = self._get(key)
+        if not hit:
+            return None
+        answer, answer_patient_id, data_version = entry
+        if answer_patient_id and not self._is_current(answer_patient_id, data_version):
+            with self._lock:
+                self._entries.pop(key, None)
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return answer, answer_patient_id
+
+    def _is_current(self, answer_patient_id: str, data_version: int) -> bool:
+        # Revalidated outside the lock, it makes network requests. A timeout or error is a miss
+        if self.revalidate is None:
+            self.revalidate = get_fhir_client().revalidate_patient
+        try:
+            if not self.revalidate(answer_patient_id):
+                return False
+        except Exception:
+            return False
+        return self.data_version(answer_patient_id) == data_version
+
+    def put(self, prompt: str, patient_id: Optional[str], model: str, answer: str,
+            answer_patient_id: Optional[str] = None):
+        """
+        Args:
+            prompt: The user's prompt
+            patient_id: Patient the session was on when the prompt was asked, as passed to get
+            model: Name of the model answering
+            answer: The final answer shown to the user
+            answer_patient_id: Patient whose data the answer was built from, if any
+        """
+        data_version = self.data_version(answer_patient_id) if answer_patient_id else None
+        self._put((normalize_prompt(prompt), patient_id, model), (answer, answer_patient_id, data_version))
+
+    def invalidate_patient(self, patient_id: str):
+        with self._lock:
+            for key in [key for key, (entry, _) in self._entries.items() if patient_id in (key[1], entry[1])]:
+                del self._entries[key]
+
+
+class SearchResultCache(_TTLCache):
+    """
+    Formatted search tool results keyed by backend, backend version and normalized query.
+
+    Rebuilding the offline search index changes the local backend's version, so results from
+    the previous index are not served afterwards.
+    """
+
+    def __init__(self, ttl_seconds: float = SEARCH_RESULT_TTL_SECONDS, max_entries: int = SEARCH_RESULT_MAX_ENTRIES):
+        super().__init__(ttl_seconds, max_entries)
+
+    def get(self, backend: str, version: Optional[str], query: str) -> Optional[str]:
+        _, result = self._get((backend, version, normalize_prompt(query)))
+        return result
+
+    def put(self, backend: str, version: Optional[str], query: str, result: str):
+        self._put((backend, version, normalize_prompt(query)), result)
+
+
+# Process-wide, shared by every Streamlit session
+tool_result_cache = ToolResultCache()
+answer_cache = AnswerCache()
+search_result_cache = SearchResultCache()
@@ -1,28 +1,46 @@
-import requests
+from typing import List
+
 from agents import function_tool
 
+from labs.aitools.tools.response_cache import search_result_cache
+from labs.aitools.tools.search.search_backend import get_search_backend
+from labs.aitools.tools.search.search_index import SearchDocument
+
+# Characters of a document shown as the summary or a related topic
+SUMMARY_MAX_CHARS = 600
+TOPIC_MAX_CHARS = 200
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+def format_search_results(query: str, documents: List[SearchDocument]) -> str:
+    """Best match as the summary, followed by up to 3 related topics."""
+    if not documents:
+        return f"No relevant information found for: {query}"
+
+    summary = documents[0]
+    formatted_result = f"Summary: {summary.title}: {_shorten(summary.text, SUMMARY_MAX_CHARS)}\n"
+    if summary.source:
+        formatted_result += f"Source: {summary.source}\n"
+
+    if len(documents) > 1:
+        formatted_result += "\nRelated Topics:\n"
+        for document in documents[1:4]:
+            formatted_result += f"- {document.title}: {_shorten(document.text, TOPIC_MAX_CHARS)}\n"
+
+    return formatted_result
+
 
 @function_tool
-def search_duckduckgo(query: str) -> str:
+async def search_duckduckgo(query: str) -> str:
     """
-    TODO:
-    Instructions for implementing search_duckduckgo function:
-    1. Make a GET request to DuckDuckGo's API endpoint
-    2. Configure request parameters:
-       - q: Search query string
-       - format: Request JSON response
-       - no_html: Exclude HTML from results
-       - skip_disambig: Skip disambiguation pages
-    3. Process the API response:
-       - Extract Abstract for main summary
-       - Get up to 3 RelatedTopics for additional context
-    4. Format the results:
-       - Start with Abstract as "Summary" if available
-       - Add bullet points for RelatedTopics
-       - Return "No relevant information" if no results found
-    5. Handle errors gracefully with error message
-
-    Search the web using DuckDuckGo for information related to the query.
+    Search for information related to the query.
+
+    Uses the offline index of condition and drug summaries unless the deployment is configured
+    for live DuckDuckGo lookups.
 
     Args:
         query: The search query string
@@ -30,4 +48,15 @@ def search_duckduckgo(query: str) -> str:
     Returns:
         Formatted string with search results
     """
-    url = "https://api.duckduckgo.com/"
\ No newline at end of file
+    try:
+        backend = get_search_backend()
+        version = backend.version()
+        cached = search_result_cache.get(backend.name, version, query)
+        if cached is not None:
+            return cached
+
+        result = format_search_results(query, await backend.search(query))
+        search_result_cache.put(backend.name, version, query, result)
+        return result
+    except Exception as e:
+        return f"Error searching for information: {str(e)}"
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Dict, Type
+
+import requests
+
+from labs.aitools.tools.search.search_index import SEARCH_INDEX_PATH, BM25Index, SearchDocument
+
+# Backend the search tool uses, one of SEARCH_BACKENDS
+SEARCH_BACKEND = os.getenv("AITOOLS_SEARCH_BACKEND", "local")
+SEARCH_RESULT_LIMIT = 4
+DUCKDUCKGO_TIMEOUT_SECONDS = 10
+
+
+class SearchBackend(ABC):
+    """
+    Source of documents for the agent search tool.
+
+    Subclasses implement search, and version when their results can change without the
+    query changing, so cached results are keyed by it.
+    """
+    name = ""
+
+    def version(self) -> Optional[str]:
+        return None
+
+    @abstractmethod
+    async def search(self, query: str, limit: int = SEARCH_RESULT_LIMIT) -> List[SearchDocument]:
+        pass
+
+
+class LocalSearchBackend(SearchBackend):
+    """
+    BM25 search over the offline index, reloaded when ingestion rewrites the index file.
+    """
+    name = "local"
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        self._index: Optional[BM25Index] = None
+        self._loaded_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def version(self) -> Optional[str]:
+        try:
+            return str(os.path.getmtime(self.path))
+        except OSError:
+            return None
+
+    def index(self) -> BM25Index:
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                raise FileNotFoundError(
+                    f"No search index at {self.path}, build it with "
+                    f"`python -m labs.aitools.tools.search.search_index ingest <corpus>`"
+                )
+            if self._index is None or mtime != self._loaded_mtime:
+                self._index = BM25Index.load(self.path)
+                self._loaded_mtime = mtime
+            return self._index
+
+    async def search(self, query: str, limit: int = SEARCH_RESULT_LIMIT) -> List[SearchDocument]:
+        return [document for document, _ in self.index().search(query, limit)]
+
+
+class DuckDuckGoSearchBackend(SearchBackend):
+    """
+    Live DuckDuckGo Instant Answer lookups, for deployments with internet access.
+    """
+    name = "duckduckgo"
+    url = "https://api.duckduckgo.com/"
+
+    async def search(self, query: str, limit: int = SEARCH_RESULT_LIMIT) -> List[SearchDocument]:
+        response = await asyncio.to_thread(
+            requests.get, self.url,
+            params={"q": query, "format": "json", "no_html": 1, "skip_disambig": 1},
+            timeout=DUCKDUCKGO_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        documents = []
+        if data.get("AbstractText"):
+            documents.append(SearchDocument(data.get("Heading") or query, data["AbstractText"],
+                                            data.get("AbstractURL", "")))
+        for topic in data.get("RelatedTopics", []):
+            if len(documents) >= limit:
+                break
+            if topic.get("Text"):
+                documents.append(SearchDocument(topic["Text"], topic["Text"], topic.get("FirstURL", "")))
+        return documents
+
+
+SEARCH_BACKENDS: Dict[str, Type[SearchBackend]] = {
+    LocalSearchBackend.name: LocalSearchBackend,
+    DuckDuckGoSearchBackend.name: DuckDuckGoSearchBackend
+}
+
+_backends: Dict[str, SearchBackend] = {}
+_lock = threading.Lock()
+
+
+def get_search_backend(name: str = SEARCH_BACKEND) -> SearchBackend:
+    """Shared instance of a backend in SEARCH_BACKENDS."""
+    with _lock:
+        if name not in _backends:
+            if name not in SEARCH_BACKENDS:
+                raise ValueError(f"Unknown search backend {name}, expected one of {', '.join(SEARCH_BACKENDS)}")
+            _backends[name] = SEARCH_BACKENDS[name]()
+        return _backends[name]
@@ -0,0 +1,146 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, asdict
+from typing import List, Tuple, Dict, Iterable
+
+SEARCH_INDEX_PATH = os.getenv(
+    "AITOOLS_SEARCH_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "search_index.json")
+)
+
+# Standard BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "of", "on",
+    "or", "that", "the", "this", "to", "was", "what", "when", "which", "with"
+})
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOP_WORDS]
+
+
+@dataclass
+class SearchDocument:
+    title: str
+    text: str
+    source: str = ""
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over a corpus of condition and drug summaries.
+
+    Postings are built once when the index is created or loaded, so a query only touches the
+    documents containing one of its terms.
+    """
+
+    def __init__(self, documents: List[SearchDocument], k1: float = BM25_K1, b: float = BM25_B):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for doc_id, document in enumerate(documents):
+            terms = tokenize(f"{document.title} {document.text}")
+            self._lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self._postings.setdefault(term, []).append((doc_id, frequency))
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query: str, limit: int = 4) -> List[Tuple[SearchDocument, float]]:
+        """
+        Returns:
+            Up to limit (document, score) pairs, best match first
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self.documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings:
+                length_norm = 1 - self.b + self.b * self._lengths[doc_id] / self._average_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + \
+                    idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self.documents[doc_id], score) for doc_id, score in best]
+
+    def save(self, path: str = SEARCH_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written next to the target and renamed, so a running app never loads a partial file
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as index_file:
+            json.dump({"k1": self.k1, "b": self.b, "documents": [asdict(document) for document in self.documents]},
+                      index_file)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str = SEARCH_INDEX_PATH) -> "BM25Index":
+        with open(path, "r") as index_file:
+            data = json.load(index_file)
+        return cls([SearchDocument(**document) for document in data["documents"]], data["k1"], data["b"])
+
+
+def read_corpus(paths: Iterable[str]) -> List[SearchDocument]:
+    """
+    Read summaries from JSON Lines files with title, text and optional source fields, and from
+    Markdown or text files, whose first line is the title. Directories are read recursively.
+    """
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, file_names in sorted(os.walk(path)):
+                documents.extend(read_corpus(os.path.join(directory, name) for name in sorted(file_names)))
+        elif path.endswith(".jsonl"):
+            with open(path, "r") as corpus:
+                for line in corpus:
+                    if line.strip():
+                        record = json.loads(line)
+                        documents.append(SearchDocument(record["title"], record["text"], record.get("source", "")))
+        elif path.endswith((".md", ".txt")):
+            with open(path, "r") as summary:
+                title, _, text = summary.read().strip().partition("\n")
+            documents.append(SearchDocument(title.lstrip("# ").strip(), text.strip(), os.path.basename(path)))
+    return documents
+
+
+def fdb_cache_documents() -> List[SearchDocument]:
+    """Drug summaries from the monographs in the local FDB cache."""
+    from lof.cache import FDBDrugCache
+
+    documents = []
+    for _, drug_names, info in FDBDrugCache().monographs():
+        sections = [info.get("uses"), info.get("caution"), info.get("side_effects")]
+        text = "\n".join(section if isinstance(section, str) else "\n".join(map(str, section))
+                         for section in sections if section)
+        documents.append(SearchDocument(info.get("name") or ", ".join(drug_names), text, "FDB"))
+    return documents
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the offline search index used by the agent search tool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = subparsers.add_parser("ingest", help="Build the index from a corpus of summaries")
+    ingest_parser.add_argument("paths", nargs="*", help="JSON Lines, Markdown or text files, or directories of them")
+    ingest_parser.add_argument("--fdb-cache", action="store_true",
+                               help="Also index the drug monographs in the local FDB cache")
+    ingest_parser.add_argument("--output", default=SEARCH_INDEX_PATH, help="Where to write the index")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        documents = read_corpus(args.paths)
+        if args.fdb_cache:
+            documents.extend(fdb_cache_documents())
+        BM25Index(documents).save(args.output)
+        print(f"Search index built: {len(documents)} documents saved to {args.output}")
@@ -64,7 +64,6 @@ def retrieve_patient_from_hg(patient):
 def fetch_conditions_from_hg(patients_data, output_file="retrieved_conditions.json"):
     """Fetch all conditions for each HG patient and save to JSON."""
     token_service = HealthGorillaTokenService()
-    headers = {"Authorization": f"Bearer {token_service.get_bearer_token()}"}
 
     all_conditions = {}
 
@@ -79,7 +78,9 @@ def fetch_conditions_from_hg(patients_data, output_file="retrieved_conditions.js
         url = f"{HG_BASE_URL}/Condition"
         params = {"patient": patient_id}
         try:
-            resp = requests.get(url, headers=headers, params=params)
+            resp = token_service.call_with_bearer_token(
+                lambda token: requests.get(url, headers={"Authorization": f"Bearer {token}"}, params=params)
+            )
             resp.raise_for_status()
             cond_data = resp.json()
             entries = cond_data.get("entry", [])
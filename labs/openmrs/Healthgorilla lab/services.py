@@ -1,4 +1,7 @@
+import asyncio
 import os
+import threading
+import time
 
 import requests
 
@@ -13,44 +16,176 @@ BASE_HEADERS = {
 }
 
 
-def get_lof_auth_token():
+# Tokens are refreshed this many seconds before they expire
+TOKEN_EXPIRY_MARGIN = 60
+# Lifetime assumed when a token response does not carry expires_in
+DEFAULT_TOKEN_TTL = 300
+
+
+class TokenManager:
+    """
+    Caches a bearer token until shortly before it expires.
+
+    Refreshes are single-flight: concurrent threads and coroutines asking for an
+    expired token wait on the one in-flight fetch instead of minting their own.
+    """
+
+    def __init__(self, fetch_token, expiry_margin=TOKEN_EXPIRY_MARGIN):
+        """
+        Args:
+            fetch_token: Callable returning (access_token, expires_in_seconds or None)
+            expiry_margin: Seconds before expiry at which the token is considered stale
+        """
+        self._fetch_token = fetch_token
+        self._expiry_margin = expiry_margin
+        self._lock = threading.Lock()
+        self._token = None
+        self._refresh_at = 0.0
+
+    def _cached_token(self):
+        if self._token and time.monotonic() < self._refresh_at:
+            return self._token
+        return None
+
+    def get_token(self):
+        token = self._cached_token()
+        if token:
+            return token
+        with self._lock:
+            token = self._cached_token()
+            if token:
+                return token
+            token, expires_in = self._fetch_token()
+            ttl = expires_in or DEFAULT_TOKEN_TTL
+            # Short-lived tokens still get half their lifetime rather than none
+            self._token = token
+            self._refresh_at = time.monotonic() + max(ttl - self._expiry_margin, ttl / 2)
+            return token
+
+    async def get_token_async(self):
+        token = self._cached_token()
+        if token:
+            return token
+        # Refresh off the event loop; the thread lock keeps it single-flight
+        return await asyncio.to_thread(self.get_token)
+
+    def invalidate(self, token=None):
+        """
+        Drop the cached token so the next caller refreshes it.
+
+        Args:
+            token: If given, only invalidate when it is still the cached token, so a
+                   stale 401 does not discard a token another caller just refreshed
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._refresh_at = 0.0
+
+
+def _post_lof_auth_token():
     lof_credentials = {
         "client_id": os.getenv('client_id'),
         "client_secret": os.getenv('client_secret')
     }
-    response = requests.post(BASE_URL + '/generate-access-token/', json=lof_credentials, headers=BASE_HEADERS)
+    return requests.post(BASE_URL + '/generate-access-token/', json=lof_credentials, headers=BASE_HEADERS)
+
+
+def get_lof_auth_token():
+    response = _post_lof_auth_token()
     if response.status_code == 200:
         return response.status_code, response.json()['access_token']
     return response.status_code, response.json()['error']
 
 
+def _fetch_lof_auth_token():
+    response = _post_lof_auth_token()
+    if response.status_code == 200:
+        response_json = response.json()
+        return response_json['access_token'], response_json.get('expires_in')
+    print(f"Failed to get LoF auth token: {response.status_code} : {response.json()['error']}")
+    raise Exception(f"Failed to get LoF auth token: {response.status_code}")
+
+
+lof_token_manager = TokenManager(_fetch_lof_auth_token)
+
+
+def _bearer_headers(token):
+    return {
+        "Content-Type": "application/json",
+        "Authorization": "Bearer " + token
+    }
+
+
 def lof_service_request_headers():
-    status_code, lof_auth_token = get_lof_auth_token()
-    if status_code == 200:
-        return {
-            "Content-Type": "application/json",
-            "Authorization": "Bearer " + lof_auth_token
-        }
+    return _bearer_headers(lof_token_manager.get_token())
+
+
+def lof_service_request(method, path, **kwargs):
+    """
+    Send an authenticated request to a LoF service endpoint.
+
+    A 401 invalidates the cached LoF token and the request is retried once with a fresh one.
+    """
+    token = lof_token_manager.get_token()
+    response = requests.request(method, BASE_URL + path, headers=_bearer_headers(token), **kwargs)
+    if response.status_code == 401:
+        lof_token_manager.invalidate(token)
+        token = lof_token_manager.get_token()
+        response = requests.request(method, BASE_URL + path, headers=_bearer_headers(token), **kwargs)
+    return response
+
+
+def _fetch_hg_token():
+    response = lof_service_request('POST', '/hg/token/', json={})
+    if response.status_code == 200:
+        response_json = response.json()
+        return response_json['access_token'], response_json.get('expires_in')
+    print(f"Failed to get Health Gorilla token: {response.status_code} : {response.json()['message']}")
+    raise Exception(f"Failed to get Health Gorilla token: {response.status_code}")
+
+
+hg_token_manager = TokenManager(_fetch_hg_token)
+
+
+def _is_unauthorized(response):
+    return response is not None and getattr(response, 'status_code', None) == 401
+
+
+def call_with_bearer_token(token_manager, call):
+    """
+    Run call(token) with the cached token. If the service rejects it with a 401, the token
+    is invalidated and call runs once more with a fresh one.
+
+    call may return the response or raise the requests.HTTPError from raise_for_status.
+    """
+    token = token_manager.get_token()
+    try:
+        result = call(token)
+    except requests.HTTPError as e:
+        if not _is_unauthorized(e.response):
+            raise
     else:
-        print(f"Failed to get LoF auth token: {status_code} : {lof_auth_token}")
-        raise Exception(f"Failed to get LoF auth token: {status_code}")
+        if not _is_unauthorized(result):
+            return result
+    token_manager.invalidate(token)
+    return call(token_manager.get_token())
 
 
 class HealthGorillaTokenService:
 
     def get_bearer_token(self):
-        response = requests.post(BASE_URL + '/hg/token/', json={}, headers=lof_service_request_headers())
-        if response.status_code == 200:
-            return response.json()['access_token']
-        else:
-            print(f"Failed to get Health Gorilla token: {response.status_code} : {response.json()['message']}")
-            raise Exception(f"Failed to get Health Gorilla token: {response.status_code}")
+        return hg_token_manager.get_token()
+
+    def call_with_bearer_token(self, call):
+        """Run call(token) against Health Gorilla, refreshing the token once on a 401."""
+        return call_with_bearer_token(hg_token_manager, call)
 
 
 class IMONLPService:
 
     def tokenize_text(self, text):
-        response = requests.post(BASE_URL + '/imo/nlp', json={'text': text}, headers=lof_service_request_headers())
+        response = lof_service_request('POST', '/imo/nlp', json={'text': text})
         if response.status_code == 200:
             return response.json()
         else:
@@ -68,7 +203,7 @@ class IMONormalizeService:
             "input_code_system": "",
             "threshold": 0
         }
-        response = requests.post(BASE_URL + '/imo/normalize', json=json_data, headers=lof_service_request_headers())
+        response = lof_service_request('POST', '/imo/normalize', json=json_data)
         if response.status_code == 200:
             return response.json()
         else:
@@ -79,13 +214,11 @@ class IMONormalizeService:
 class FDBService:
 
     def get_drug_info(self, drug_name):
-        response = requests.get(BASE_URL + '/fdb/smart-search', params={'name': drug_name},
-                                headers=lof_service_request_headers())
+        response = lof_service_request('GET', '/fdb/smart-search', params={'name': drug_name})
 
         response_json = response.json()
         id = response_json['data']['best_match']['id']
-        response = requests.get(BASE_URL + f'/fdb/meducation/content', params={'code': id},
-                                headers=lof_service_request_headers())
+        response = lof_service_request('GET', '/fdb/meducation/content', params={'code': id})
 
         if response.status_code == 200:
             response_json = response.json()
@@ -0,0 +1,262 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), './../..')))
+from labs.tokenization.medical_note_tokenizer import BaseTokenizer, IMOTokenizer, OpenRouterTokenizer, \
+    TokenizationResult, OPENROUTER_API_KEY
+from lof.cache import text_digest
+
+DEFAULT_OPENROUTER_MODEL = "google/gemini-2.0-flash-lite-001"
+
+
+class RateLimiter:
+    """Spaces calls at least 1 / rate seconds apart across all worker threads."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class RateLimitedTokenizer(BaseTokenizer):
+    """
+    Applies a RateLimiter to every tokenize call of the wrapped tokenizer.
+
+    Chunked notes go through tokenize once per chunk, so each API request is limited.
+    """
+
+    def __init__(self, tokenizer: BaseTokenizer, rate_limiter: RateLimiter):
+        self.tokenizer = tokenizer
+        self.rate_limiter = rate_limiter
+
+    def tokenize(self, text: str) -> List[TokenizationResult]:
+        self.rate_limiter.acquire()
+        return self.tokenizer.tokenize(text)
+
+
+def iter_notes(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (note_id, text) from a directory of .txt files or a JSONL file.
+
+    JSONL lines need a "text" field and may carry an "id"; otherwise the line number is used.
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for file_name in sorted(files):
+                if not file_name.endswith('.txt'):
+                    continue
+                file_path = os.path.join(root, file_name)
+                with open(file_path, 'r') as note:
+                    yield os.path.relpath(file_path, path), note.read()
+    else:
+        with open(path, 'r') as notes:
+            for line_number, line in enumerate(notes, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield str(record.get('id', line_number)), record['text']
+
+
+def load_processed_hashes(progress_path: str) -> Set[str]:
+    if not os.path.exists(progress_path):
+        return set()
+    with open(progress_path, 'r') as progress:
+        return {line.strip() for line in progress if line.strip()}
+
+
+def result_row(note_id: str, note_hash: str, result: TokenizationResult) -> Dict:
+    row = asdict(result)
+    row['note_id'] = note_id
+    row['note_hash'] = note_hash
+    return row
+
+
+class JSONLResultWriter:
+    """
+    Appends rows to a JSONL file, flushing after every note.
+
+    write and flush return the hashes of the notes whose rows are on disk, which is the
+    contract tokenize_corpus relies on before recording a note as processed.
+    """
+
+    def __init__(self, output_path: str):
+        self._output = open(output_path, 'a')
+
+    def write(self, rows: List[Dict], note_hash: str) -> List[str]:
+        for row in rows:
+            self._output.write(json.dumps(row) + '\n')
+        self._output.flush()
+        return [note_hash]
+
+    def flush(self) -> List[str]:
+        return []
+
+    def close(self):
+        self._output.close()
+
+
+class ParquetResultWriter:
+    """
+    Writes rows to numbered part files in an output directory.
+
+    Each run adds new parts, so resumed runs never rewrite earlier output. Rows are buffered
+    until a part is written, and write and flush only return the hashes of notes whose rows
+    are in a written part.
+    """
+
+    def __init__(self, output_dir: str, rows_per_part: int = 50000):
+        # Fail at startup rather than after the first batch if pyarrow is missing
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ImportError("Parquet output requires pyarrow, install it with `pip install pyarrow`")
+
+        self.output_dir = output_dir
+        self.rows_per_part = rows_per_part
+        os.makedirs(output_dir, exist_ok=True)
+        self._part = len([name for name in os.listdir(output_dir) if name.endswith('.parquet')])
+        self._rows = []
+        self._note_hashes = []
+
+    def write(self, rows: List[Dict], note_hash: str) -> List[str]:
+        for row in rows:
+            row = dict(row, codes=json.dumps(row['codes']))
+            self._rows.append(row)
+        self._note_hashes.append(note_hash)
+        if len(self._rows) >= self.rows_per_part:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[str]:
+        import pyarrow
+        import pyarrow.parquet
+
+        if self._rows:
+            table = pyarrow.Table.from_pylist(self._rows)
+            pyarrow.parquet.write_table(table, os.path.join(self.output_dir, f"part-{self._part:05d}.parquet"))
+            self._part += 1
+        flushed = self._note_hashes
+        self._rows = []
+        self._note_hashes = []
+        return flushed
+
+    def close(self):
+        self.flush()
+
+
+def tokenize_corpus(notes: Iterator[Tuple[str, str]], tokenizer: BaseTokenizer, writer, progress_path: str,
+                    max_workers: int = 4) -> Tuple[int, int, int]:
+    """
+    Tokenize a stream of notes on a worker pool, skipping notes already recorded in progress_path.
+
+    A note's hash is appended to progress_path only once the writer reports its rows are on disk,
+    so an interrupted run can be resumed without losing or duplicating notes. Buffered rows are
+    flushed and recorded before returning, including when the run is interrupted.
+
+    Returns:
+        (processed, skipped, failed) note counts
+    """
+    processed_hashes = load_processed_hashes(progress_path)
+    processed = skipped = failed = 0
+    in_flight = {}
+
+    def record(note_hashes):
+        for note_hash in note_hashes:
+            progress.write(note_hash + '\n')
+        progress.flush()
+
+    def drain(return_when):
+        nonlocal processed, failed
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            note_id, note_hash = in_flight.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"Failed to tokenize note {note_id}: {e}")
+                failed += 1
+                continue
+            record(writer.write([result_row(note_id, note_hash, result) for result in results], note_hash))
+            processed_hashes.add(note_hash)
+            processed += 1
+            if processed % 100 == 0:
+                print(f"Tokenized {processed} notes ({skipped} skipped, {failed} failed)")
+
+    with open(progress_path, 'a') as progress, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        submitted_hashes = set()
+        try:
+            for note_id, text in notes:
+                note_hash = text_digest(text)
+                if note_hash in processed_hashes or note_hash in submitted_hashes:
+                    skipped += 1
+                    continue
+                submitted_hashes.add(note_hash)
+                in_flight[executor.submit(tokenizer.tokenize_document, text)] = (note_id, note_hash)
+                # Keep a bounded number of notes in memory
+                if len(in_flight) >= max_workers * 2:
+                    drain(FIRST_COMPLETED)
+            if in_flight:
+                drain(ALL_COMPLETED)
+        finally:
+            record(writer.flush())
+
+    return processed, skipped, failed
+
+
+def create_tokenizer(engine: str, model: str, api_key: str) -> BaseTokenizer:
+    if engine == 'imo':
+        return IMOTokenizer()
+    return OpenRouterTokenizer(api_key, model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tokenize a corpus of medical notes without the Streamlit UI')
+    parser.add_argument('input', help='Directory of .txt notes or JSONL file with id/text fields')
+    parser.add_argument('output', help='JSONL file, or a directory of part files with --format parquet')
+    parser.add_argument('--engine', choices=['imo', 'openrouter'], default='imo')
+    parser.add_argument('--model', default=DEFAULT_OPENROUTER_MODEL, help='OpenRouter model')
+    parser.add_argument('--api-key', default=os.getenv('OPENROUTER_API_KEY', OPENROUTER_API_KEY),
+                        help='OpenRouter API key')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--workers', type=int, default=4, help='Notes tokenized in parallel')
+    parser.add_argument('--rate', type=float, default=None, help='Maximum API requests per second')
+    parser.add_argument('--progress', default=None,
+                        help='File of processed note hashes used to resume (default: <output>.done)')
+    args = parser.parse_args()
+
+    tokenizer = RateLimitedTokenizer(create_tokenizer(args.engine, args.model, args.api_key),
+                                     RateLimiter(args.rate))
+    if args.format == 'parquet':
+        writer = ParquetResultWriter(args.output)
+    else:
+        writer = JSONLResultWriter(args.output)
+    progress_path = args.progress or args.output.rstrip('/') + '.done'
+
+    start = time.perf_counter()
+    try:
+        processed, skipped, failed = tokenize_corpus(iter_notes(args.input), tokenizer, writer, progress_path,
+                                                     max_workers=args.workers)
+    finally:
+        writer.close()
+    print(f"Tokenized {processed} notes in {time.perf_counter() - start:.1f}s "
+          f"({skipped} already processed, {failed} failed)")
+
+
+if __name__ == '__main__':
+    main()
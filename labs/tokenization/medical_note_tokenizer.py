@@ -1,8 +1,11 @@
 import streamlit as st
 import requests
 import json
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, replace
 from abc import ABC, abstractmethod
 
 # Constants
@@ -11,9 +14,13 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), './../..')))
 from labs.tokenization.constants import TOKEN_PROMPT
+from lof.cache import TokenizationCache
 from lof.services import IMONLPService
 
 MAX_CHARS = 10000
+# Characters shared by neighbouring chunks so entities on a boundary are seen whole
+CHUNK_OVERLAP = 500
+MAX_PARALLEL_CHUNKS = 4
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 #Update your openrouter key
 OPENROUTER_API_KEY = ""
@@ -25,6 +32,8 @@ class TokenizationResult:
     codes: Dict[str, str]
     source: str
     assertion: str
+    begin: Optional[int] = None
+    end: Optional[int] = None
 
 def format_codes_with_assertion(result_type, result_data):
     result = result_data.get(result_type)
@@ -39,7 +48,6 @@ def format_codes_with_assertion(result_type, result_data):
 
 def process_entity_codes(entity: Dict, source: str) -> TokenizationResult:
     """
-    TODO: Implement process_entity_codes
     Process entity codes from medical text tokenization
     Steps:
     1. Initialize empty codes dictionary
@@ -58,74 +66,167 @@ def process_entity_codes(entity: Dict, source: str) -> TokenizationResult:
     """
     codes = {}
 
-    # Your implementation here
-
+    for system, codemap in (entity.get('codemaps') or {}).items():
+        if system.lower() == 'imo' and source == 'IMO':
+            lexical_code = codemap.get('lexical_code')
+            if lexical_code:
+                codes[system] = lexical_code
+        elif codemap.get('codes'):
+            first_code = codemap['codes'][0]
+            code = first_code.get('rxnorm_code') or first_code.get('code')
+            if code:
+                codes[system] = code
 
     return TokenizationResult(
         text=entity['text'],
         semantic_type=entity['semantic'],
         codes=codes,
         source=source,
-        assertion=entity['assertion']
+        assertion=entity['assertion'],
+        begin=entity.get('begin'),
+        end=entity.get('end')
     )
 
 
+@st.cache_resource
+def get_tokenization_cache() -> TokenizationCache:
+    """Share one IMO NLP result cache across Streamlit reruns and sessions."""
+    return TokenizationCache()
+
+
+_SECTION_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n')
+
+
+def _last_break(text: str, start: int, end: int) -> Optional[int]:
+    """Position just after the last section break, else sentence break, in text[start:end]."""
+    for pattern in (_SECTION_BREAK, _SENTENCE_BREAK):
+        breaks = [match.end() for match in pattern.finditer(text, start, end)]
+        if breaks:
+            return breaks[-1]
+    return None
+
+
+def _first_break(text: str, start: int, end: int) -> Optional[int]:
+    """Position just after the first sentence break in text[start:end]."""
+    match = _SENTENCE_BREAK.search(text, start, end)
+    return match.end() if match else None
+
+
+def split_into_chunks(text: str, max_chars: int = MAX_CHARS,
+                      overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, str]]:
+    """
+    Split a note into chunks of at most max_chars, cutting on section or sentence boundaries.
+
+    Neighbouring chunks share roughly overlap characters, starting on a sentence boundary.
+
+    Returns:
+        List of (offset of the chunk in text, chunk text)
+    """
+    chunks = []
+    start = 0
+    while True:
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            # Only accept a boundary in the back half so chunks stay reasonably full
+            end = _last_break(text, start + max_chars // 2, end) or end
+        chunks.append((start, text[start:end]))
+        if end >= len(text):
+            return chunks
+        overlap_start = max(end - overlap, start + 1)
+        start = _first_break(text, overlap_start, end) or overlap_start
+        if start >= end:
+            start = overlap_start
+
+
+def _merge_chunk_results(chunk_results: List[Tuple[int, List[TokenizationResult]]]) -> List[TokenizationResult]:
+    """Re-base chunk offsets onto the whole note and drop entities repeated in overlaps."""
+    merged = []
+    seen = set()
+    for offset, results in chunk_results:
+        for result in results:
+            if result.begin is not None and result.end is not None:
+                result = replace(result, begin=result.begin + offset, end=result.end + offset)
+                key = (result.begin, result.end, result.text.upper())
+            else:
+                key = (result.text.upper(), result.semantic_type, tuple(sorted(result.codes.items())))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged
+
+
 class BaseTokenizer(ABC):
     @abstractmethod
     def tokenize(self, text: str) -> List[TokenizationResult]:
         pass
 
+    def tokenize_document(self, text: str, max_chars: int = MAX_CHARS,
+                          max_workers: int = MAX_PARALLEL_CHUNKS) -> List[TokenizationResult]:
+        """
+        Tokenize a note of any length.
+
+        Notes over max_chars are split into overlapping chunks that are tokenized concurrently,
+        then merged with offsets relative to the whole note.
+        """
+        if len(text) <= max_chars:
+            return self.tokenize(text)
+
+        chunks = split_into_chunks(text, max_chars)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            chunk_results = list(executor.map(lambda chunk: (chunk[0], self.tokenize(chunk[1])), chunks))
+        return _merge_chunk_results(chunk_results)
+
 
 class OpenRouterTokenizer(BaseTokenizer):
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, api_url: str = OPENROUTER_API_URL):
         self.api_key = api_key
         self.model = model
+        self.api_url = api_url
 
+    # Runs on worker threads without a Streamlit context, errors are reported by the caller
     def tokenize(self, text: str) -> List[TokenizationResult]:
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "http://localhost:8501",
-                "X-Title": "Medical Note Tokenizer"
-            }
-            payload = {
-                "messages": [
-                    {"role": "system", "content": TOKEN_PROMPT},
-                    {"role": "user", "content": text}
-                ],
-                "model": self.model,
-                "response_format": {"type": "json_object"}
-            }
-            response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            content = response.json()['choices'][0]['message']['content']
-            data = json.loads(content)
-
-            results = []
-            for entity in data['entities']:
-                results.append(process_entity_codes(entity, 'OpenRouter'))
-
-            return results
-        except Exception as e:
-            st.error(f"OpenRouter API Error: {str(e)}")
-            raise e
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost:8501",
+            "X-Title": "Medical Note Tokenizer"
+        }
+        payload = {
+            "messages": [
+                {"role": "system", "content": TOKEN_PROMPT},
+                {"role": "user", "content": text}
+            ],
+            "model": self.model,
+            "response_format": {"type": "json_object"}
+        }
+        response = requests.post(self.api_url, headers=headers, json=payload)
+        response.raise_for_status()
+        content = response.json()['choices'][0]['message']['content']
+        data = json.loads(content)
+
+        results = []
+        for entity in data['entities']:
+            results.append(process_entity_codes(entity, 'OpenRouter'))
+
+        return results
 
 
 class IMOTokenizer(BaseTokenizer):
+    def __init__(self, cache: Optional[TokenizationCache] = None):
+        self.nlp_service = IMONLPService(cache=cache or get_tokenization_cache())
+
+    # Runs on worker threads without a Streamlit context, errors are reported by the caller
     def tokenize(self, text: str) -> List[TokenizationResult]:
-        try:
-            data = IMONLPService().tokenize_text(text=text)
-            entities_to_consider = ['problem', 'drug','treatment', 'imo_procedure', 'test']
-            results = []
-            for entity in data['entities']:
-                if entity['semantic'] not in entities_to_consider:
-                    continue
-                results.append(process_entity_codes(entity, 'IMO'))
-            return results
-        except Exception as e:
-            st.error(f"IMO API Error: {str(e)}")
-            raise e
+        data = self.nlp_service.tokenize_text(text=text)
+        entities_to_consider = ['problem', 'drug','treatment', 'imo_procedure', 'test']
+        results = []
+        for entity in data['entities']:
+            if entity['semantic'] not in entities_to_consider:
+                continue
+            results.append(process_entity_codes(entity, 'IMO'))
+        return results
 
 
 def check_file_size(content: str) -> bool:
@@ -133,9 +234,31 @@ def check_file_size(content: str) -> bool:
     return len(content) <= MAX_CHARS
 
 
+def group_results_by_text(results_by_engine: Dict[str, List[TokenizationResult]]) -> Dict[str, Dict]:
+    """
+    Match results from several engines by entity text, case-insensitively.
+
+    Results without codes are skipped. Each entry holds the original text, one result per
+    engine keyed by engine name, and the semantic type reported by the IMO engine.
+
+    Returns:
+        Dictionary keyed by upper-cased entity text
+    """
+    results_by_text = {}
+    for engine, results in results_by_engine.items():
+        for result in results:
+            if not result.codes:
+                continue
+            result_data = results_by_text.setdefault(result.text.upper(), {'text': result.text})
+            result_data[engine] = result
+            if engine == 'imo':
+                result_data['semantic_type'] = result.semantic_type
+    return results_by_text
+
+
 def display_comparison(openrouter_results: List[TokenizationResult], imo_results: List[TokenizationResult]):
     """
-    TODO: Display comparison of OpenRouter and IMO tokenization results by:
+    Display comparison of OpenRouter and IMO tokenization results by:
     1. Creating dictionary to store results by text (upper case for case-insensitive matching)
     2. Adding OpenRouter results with codes to dictionary, skipping empty codes
     3. Adding IMO results with codes and semantic type to dictionary, skipping empty codes 
@@ -150,28 +273,48 @@ def display_comparison(openrouter_results: List[TokenizationResult], imo_results
     """
     st.subheader("Token(Unique) Details")
 
-    # Create dictionary to store results by text
-    results_by_text = {}
-    
-    # Add OpenRouter results
-    for result in openrouter_results:
-        # Your implementation code here
-        pass
-
-    # Add IMO results and semantic type
-    for result in imo_results:
-        # Your implementation code here
-        pass
+    results_by_text = group_results_by_text({'openrouter': openrouter_results, 'imo': imo_results})
 
     # Create combined table
     combined_table = []
     for result_data in results_by_text.values():
-        # Your implementation code here
-        pass
+        combined_table.append({
+            'Text': result_data['text'],
+            'Semantic Type': result_data.get('semantic_type', ''),
+            'OpenRouter Codes': format_codes_with_assertion('openrouter', result_data),
+            'IMO Codes': format_codes_with_assertion('imo', result_data)
+        })
 
     st.dataframe(combined_table, use_container_width=True)
 
 
+def _timed_tokenize(tokenizer: BaseTokenizer, text: str):
+    start = time.perf_counter()
+    try:
+        results, error = tokenizer.tokenize_document(text), None
+    except Exception as e:
+        results, error = [], e
+    return results, time.perf_counter() - start, error
+
+
+def tokenize_concurrently(tokenizers: Dict[str, BaseTokenizer],
+                          text: str) -> Iterator[Tuple[str, List[TokenizationResult], float, Optional[Exception]]]:
+    """
+    Run several tokenizers on the same text at once.
+
+    Tokenizer exceptions are caught on the worker threads and yielded, so the caller reports
+    them from the Streamlit script thread.
+
+    Yields:
+        (name, results, seconds taken, error or None) for each tokenizer as it finishes
+    """
+    with ThreadPoolExecutor(max_workers=len(tokenizers)) as executor:
+        futures = {executor.submit(_timed_tokenize, tokenizer, text): name for name, tokenizer in tokenizers.items()}
+        for future in as_completed(futures):
+            results, elapsed, error = future.result()
+            yield futures[future], results, elapsed, error
+
+
 def main():
     st.title("Medical Note Tokenizer")
 
@@ -193,21 +336,35 @@ def main():
         content = uploaded_file.read().decode()
 
         if not check_file_size(content):
-            st.error(f"File exceeds maximum limit of {MAX_CHARS} characters.")
-            return
+            st.info(f"File exceeds {MAX_CHARS} characters and will be tokenized in "
+                    f"{len(split_into_chunks(content))} chunks.")
 
         st.subheader("File Content")
         st.text_area("Original Text", value=content, height=200, disabled=True)
 
         if st.button("Tokenize"):
-            with st.spinner("Processing..."):
-                openrouter_tokenizer = OpenRouterTokenizer(OPENROUTER_API_KEY, model_choice)
-                imo_tokenizer = IMOTokenizer()
-
-                openrouter_results = openrouter_tokenizer.tokenize(content)
-                imo_results = imo_tokenizer.tokenize(content)
+            tokenizers = {
+                'OpenRouter': OpenRouterTokenizer(OPENROUTER_API_KEY, model_choice),
+                'IMO': IMOTokenizer()
+            }
+            timing_columns = st.columns(len(tokenizers))
+            timing_placeholders = {name: column.empty() for name, column in zip(tokenizers, timing_columns)}
+            for name, placeholder in timing_placeholders.items():
+                placeholder.metric(f"{name} time", "running...")
+            comparison_placeholder = st.empty()
 
-                display_comparison(openrouter_results, imo_results)
+            results = {name: [] for name in tokenizers}
+            with st.spinner("Processing..."):
+                # Re-render the table as each engine finishes instead of waiting for both
+                for name, engine_results, elapsed, error in tokenize_concurrently(tokenizers, content):
+                    if error:
+                        timing_placeholders[name].metric(f"{name} time", "failed")
+                        st.error(f"{name} API Error: {str(error)}")
+                        continue
+                    timing_placeholders[name].metric(f"{name} time", f"{elapsed:.2f}s")
+                    results[name] = engine_results
+                    with comparison_placeholder.container():
+                        display_comparison(results['OpenRouter'], results['IMO'])
 
 
 if __name__ == "__main__":
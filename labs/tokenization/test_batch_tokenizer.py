@@ -0,0 +1,60 @@
+import os
+import sys
+from typing import List
+
+import pytest
+
+pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), './../..')))
+from labs.tokenization.batch_tokenizer import ParquetResultWriter, load_processed_hashes, tokenize_corpus
+from labs.tokenization.medical_note_tokenizer import BaseTokenizer, TokenizationResult
+
+
+class EchoTokenizer(BaseTokenizer):
+
+    def tokenize(self, text: str) -> List[TokenizationResult]:
+        return [TokenizationResult(text, 'problem', {'ICD10CM': 'R69'}, 'test', 'present')]
+
+
+def interrupted(notes, after):
+    for position, note in enumerate(notes):
+        if position == after:
+            raise KeyboardInterrupt
+        yield note
+
+
+def written_note_ids(output_dir):
+    note_ids = []
+    for name in sorted(os.listdir(output_dir)):
+        note_ids.extend(pyarrow_parquet.read_table(os.path.join(output_dir, name)).column('note_id').to_pylist())
+    return note_ids
+
+
+def test_interrupted_parquet_run_resumes_without_losing_notes(tmp_path):
+    notes = [(str(i), f"note {i}") for i in range(5)]
+    output_dir = str(tmp_path / 'output')
+    progress_path = str(tmp_path / 'output.done')
+
+    writer = ParquetResultWriter(output_dir)
+    with pytest.raises(KeyboardInterrupt):
+        tokenize_corpus(interrupted(notes, after=3), EchoTokenizer(), writer, progress_path, max_workers=1)
+
+    # Every note recorded as processed has its rows in a written part
+    recorded = load_processed_hashes(progress_path)
+    assert len(recorded) == len(set(written_note_ids(output_dir))) == 3
+
+    processed, skipped, failed = tokenize_corpus(iter(notes), EchoTokenizer(), ParquetResultWriter(output_dir),
+                                                 progress_path, max_workers=1)
+    assert (processed, skipped, failed) == (2, 3, 0)
+    assert sorted(written_note_ids(output_dir)) == [note_id for note_id, _ in notes]
+
+
+def test_unflushed_parquet_rows_are_not_recorded(tmp_path):
+    output_dir = str(tmp_path / 'output')
+    writer = ParquetResultWriter(output_dir)
+
+    assert writer.write([{'note_id': '1', 'codes': {}}], 'hash-1') == []
+    assert not os.listdir(output_dir)
+    assert writer.flush() == ['hash-1']
+    assert written_note_ids(output_dir) == ['1']
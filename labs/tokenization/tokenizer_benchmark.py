@@ -0,0 +1,243 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), './../..')))
+import lof.services
+from labs.tokenization.batch_tokenizer import iter_notes
+from labs.tokenization.medical_note_tokenizer import BaseTokenizer, IMOTokenizer, OpenRouterTokenizer, \
+    TokenizationResult, group_results_by_text, OPENROUTER_API_KEY, OPENROUTER_API_URL
+from lof.cache import TokenizationCache, text_digest
+
+DEFAULT_OPENROUTER_MODEL = "google/gemini-2.0-flash-lite-001"
+
+# Report name -> codemap keys each engine may use for that code system
+AGREEMENT_CODE_SYSTEMS = {
+    'icd10': ('icd10cm',),
+    'snomed': ('snomed', 'snomedInternational'),
+    'rxnorm': ('rxnorm',)
+}
+
+
+class RecordedTokenizer(BaseTokenizer):
+    """
+    Replays results recorded by batch_tokenizer.py, keyed by note hash.
+
+    Lets the benchmark run offline against a fixed snapshot of an engine's output.
+    """
+
+    def __init__(self, recording_path: str):
+        self._results = defaultdict(list)
+        with open(recording_path, 'r') as recording:
+            for line in recording:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                note_hash = row.pop('note_hash')
+                row.pop('note_id', None)
+                self._results[note_hash].append(TokenizationResult(**row))
+
+    def tokenize(self, text: str) -> List[TokenizationResult]:
+        return list(self._results.get(text_digest(text), []))
+
+    def tokenize_document(self, text: str, *args, **kwargs) -> List[TokenizationResult]:
+        # Recordings already cover the whole note
+        return self.tokenize(text)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run_engine(tokenizer: BaseTokenizer, notes: List[Tuple[str, str]]) -> Tuple[Dict, Dict[str, List]]:
+    """
+    Tokenize every note in turn, timing each one.
+
+    Returns:
+        (metrics, results keyed by note id)
+    """
+    latencies = []
+    results_by_note = {}
+    failures = 0
+    total_chars = 0
+    started = time.perf_counter()
+    for note_id, text in notes:
+        start = time.perf_counter()
+        try:
+            results_by_note[note_id] = tokenizer.tokenize_document(text)
+        except Exception as e:
+            print(f"Failed to tokenize note {note_id}: {e}")
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        total_chars += len(text)
+    wall_time = time.perf_counter() - started
+
+    entity_count = sum(len(results) for results in results_by_note.values())
+    metrics = {
+        'notes': len(results_by_note),
+        'failures': failures,
+        'characters': total_chars,
+        'entities': entity_count,
+        'wall_time_seconds': wall_time,
+        'latency_seconds': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies, default=0.0)
+        },
+        'entities_per_second': entity_count / wall_time if wall_time else 0.0
+    }
+    return metrics, results_by_note
+
+
+def add_cost_metrics(metrics: Dict, cost_per_1k_chars: float):
+    """Estimate spend from characters sent and report extracted entities (tokens) per dollar."""
+    cost = metrics['characters'] / 1000 * cost_per_1k_chars
+    metrics['estimated_cost_usd'] = cost
+    metrics['entities_per_dollar'] = metrics['entities'] / cost if cost else None
+
+
+def code_system_agreement(results_by_engine: Dict[str, Dict[str, List]], engine_a: str, engine_b: str) -> Dict:
+    """
+    Compare two engines per code system using the text-keyed matching of display_comparison.
+
+    For each entity text both engines coded in a system, the codes agree when they are equal.
+    """
+    counts = {system: defaultdict(int) for system in AGREEMENT_CODE_SYSTEMS}
+    note_ids = set(results_by_engine[engine_a]) & set(results_by_engine[engine_b])
+    for note_id in note_ids:
+        results_by_text = group_results_by_text({
+            engine_a: results_by_engine[engine_a][note_id],
+            engine_b: results_by_engine[engine_b][note_id]
+        })
+        for result_data in results_by_text.values():
+            for system, codemap_keys in AGREEMENT_CODE_SYSTEMS.items():
+                code_a = _first_code(result_data.get(engine_a), codemap_keys)
+                code_b = _first_code(result_data.get(engine_b), codemap_keys)
+                if code_a and code_b:
+                    counts[system]['both_coded'] += 1
+                    if code_a.upper() == code_b.upper():
+                        counts[system]['matching'] += 1
+                elif code_a:
+                    counts[system][f'only_{engine_a}'] += 1
+                elif code_b:
+                    counts[system][f'only_{engine_b}'] += 1
+
+    agreement = {}
+    for system, system_counts in counts.items():
+        both_coded = system_counts['both_coded']
+        agreement[system] = {
+            'both_coded': both_coded,
+            'matching': system_counts['matching'],
+            f'only_{engine_a}': system_counts[f'only_{engine_a}'],
+            f'only_{engine_b}': system_counts[f'only_{engine_b}'],
+            'agreement': system_counts['matching'] / both_coded if both_coded else None
+        }
+    return agreement
+
+
+def _first_code(result, codemap_keys):
+    if result is None:
+        return None
+    for key in codemap_keys:
+        if result.codes.get(key):
+            return str(result.codes[key])
+    return None
+
+
+def corpus_fingerprint(notes: List[Tuple[str, str]]) -> str:
+    digest = hashlib.sha256()
+    for note_id, text in notes:
+        digest.update(note_id.encode('utf-8'))
+        digest.update(text_digest(text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def create_engines(specs: List[str], args) -> Dict[str, BaseTokenizer]:
+    """
+    Build tokenizers from --engine values: "imo", "openrouter", or "name=recording.jsonl".
+    """
+    engines = {}
+    for spec in specs:
+        if '=' in spec:
+            name, recording_path = spec.split('=', 1)
+            engines[name] = RecordedTokenizer(recording_path)
+        elif spec == 'imo':
+            # Use a throwaway cache so repeated benchmark runs measure the service, not the cache
+            engines['imo'] = IMOTokenizer(cache=TokenizationCache(path=':memory:'))
+        elif spec == 'openrouter':
+            engines['openrouter'] = OpenRouterTokenizer(args.api_key, args.model, args.openrouter_url)
+        else:
+            raise ValueError(f"Unknown engine: {spec}")
+    return engines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tokenizer latency, throughput, cost and agreement')
+    parser.add_argument('corpus', help='Directory of .txt notes or JSONL file with id/text fields')
+    parser.add_argument('--engine', action='append', default=None,
+                        help='imo, openrouter, or name=recording.jsonl from batch_tokenizer.py (repeatable)')
+    parser.add_argument('--report', default='tokenizer_benchmark.json', help='Where to write the JSON report')
+    parser.add_argument('--model', default=DEFAULT_OPENROUTER_MODEL, help='OpenRouter model')
+    parser.add_argument('--api-key', default=os.getenv('OPENROUTER_API_KEY', OPENROUTER_API_KEY),
+                        help='OpenRouter API key')
+    parser.add_argument('--openrouter-url', default=OPENROUTER_API_URL,
+                        help='OpenRouter chat completions URL, e.g. a local stand-in server')
+    parser.add_argument('--imo-base-url', default=None, help='LoF service base URL, e.g. a local stand-in server')
+    parser.add_argument('--cost', action='append', default=[],
+                        help='name=USD per 1k characters sent, used for entities per dollar (repeatable)')
+    args = parser.parse_args()
+
+    if args.imo_base_url:
+        lof.services.BASE_URL = args.imo_base_url
+
+    notes = list(iter_notes(args.corpus))
+    engines = create_engines(args.engine or ['imo', 'openrouter'], args)
+    costs = {name: float(value) for name, value in (spec.split('=', 1) for spec in args.cost)}
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'corpus': {'path': args.corpus, 'notes': len(notes), 'fingerprint': corpus_fingerprint(notes)},
+        'engines': {},
+        'agreement': {}
+    }
+    results_by_engine = {}
+    for name, tokenizer in engines.items():
+        print(f"Running {name} on {len(notes)} notes...")
+        metrics, results_by_engine[name] = run_engine(tokenizer, notes)
+        if name in costs:
+            add_cost_metrics(metrics, costs[name])
+        report['engines'][name] = metrics
+        latency = metrics['latency_seconds']
+        print(f"  p50 {latency['p50']:.2f}s  p95 {latency['p95']:.2f}s  p99 {latency['p99']:.2f}s  "
+              f"{metrics['entities_per_second']:.1f} entities/s")
+
+    names = list(engines)
+    for i, engine_a in enumerate(names):
+        for engine_b in names[i + 1:]:
+            agreement = code_system_agreement(results_by_engine, engine_a, engine_b)
+            report['agreement'][f'{engine_a}_vs_{engine_b}'] = agreement
+            for system, system_agreement in agreement.items():
+                if system_agreement['agreement'] is not None:
+                    print(f"  {engine_a} vs {engine_b} {system}: {system_agreement['agreement']:.1%} "
+                          f"of {system_agreement['both_coded']} entities")
+
+    with open(args.report, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
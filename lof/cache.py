@@ -0,0 +1,300 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv('LOF_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+# Drug monographs rarely change, misses are retried sooner in case FDB adds the drug
+FDB_CACHE_PATH = os.path.join(CACHE_DIR, 'fdb_drugs.sqlite3')
+FDB_CACHE_TTL = 30 * 24 * 3600
+FDB_CACHE_NEGATIVE_TTL = 24 * 3600
+FDB_CACHE_MAX_ENTRIES = 5000
+
+IMO_NLP_CACHE_PATH = os.path.join(CACHE_DIR, 'imo_nlp.sqlite3')
+IMO_NLP_CACHE_TTL = int(os.getenv('LOF_IMO_NLP_CACHE_TTL', str(7 * 24 * 3600)))
+IMO_NLP_CACHE_MEMORY_ENTRIES = 256
+
+
+def normalize_drug_name(drug_name):
+    return ' '.join(drug_name.lower().split())
+
+
+class FDBDrugCache:
+    """
+    SQLite cache of FDB drug monographs.
+
+    Drug names map to FDB ids and FDB ids map to monographs, so spelling variants of the
+    same drug share one stored monograph. Names FDB could not match are cached as misses.
+    Monographs are evicted least-recently-used once max_entries is exceeded.
+    """
+
+    def __init__(self, path=FDB_CACHE_PATH, ttl=FDB_CACHE_TTL, negative_ttl=FDB_CACHE_NEGATIVE_TTL,
+                 max_entries=FDB_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS drug_names ('
+                'name TEXT PRIMARY KEY, fdb_id TEXT, expires_at REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS monographs ('
+                'fdb_id TEXT PRIMARY KEY, info TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS monographs_accessed ON monographs (accessed_at)')
+
+    def get(self, drug_name):
+        """
+        Look up a drug by name.
+
+        Returns:
+            (hit, info) where hit is False if the name is not cached, and info is the cached
+            monograph dict or None for a cached miss
+        """
+        now = time.time()
+        name = normalize_drug_name(drug_name)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fdb_id FROM drug_names WHERE name = ? AND expires_at > ?', (name, now)
+            ).fetchone()
+            if row is None:
+                return False, None
+            fdb_id = row[0]
+            if fdb_id is None:
+                return True, None
+            info = self._get_monograph(fdb_id, now)
+            if info is None:
+                return False, None
+            return True, info
+
+    def get_by_id(self, fdb_id):
+        with self._lock:
+            return self._get_monograph(fdb_id, time.time())
+
+    def _get_monograph(self, fdb_id, now):
+        row = self._conn.execute(
+            'SELECT info FROM monographs WHERE fdb_id = ? AND expires_at > ?', (fdb_id, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._conn.execute('UPDATE monographs SET accessed_at = ? WHERE fdb_id = ?', (now, fdb_id))
+        return json.loads(row[0])
+
+    def monographs(self):
+        """
+        Returns:
+            List of (fdb_id, cached drug names mapped to it, monograph dict) for every unexpired monograph
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute('SELECT fdb_id, info FROM monographs WHERE expires_at > ?', (now,)).fetchall()
+            names = {}
+            for name, fdb_id in self._conn.execute(
+                    'SELECT name, fdb_id FROM drug_names WHERE fdb_id IS NOT NULL AND expires_at > ?', (now,)):
+                names.setdefault(fdb_id, []).append(name)
+        return [(fdb_id, names.get(fdb_id, []), json.loads(info)) for fdb_id, info in rows]
+
+    def put(self, drug_name, fdb_id, info):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO drug_names (name, fdb_id, expires_at) VALUES (?, ?, ?)',
+                (normalize_drug_name(drug_name), fdb_id, now + self.ttl)
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO monographs (fdb_id, info, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (fdb_id, json.dumps(info), now + self.ttl, now)
+            )
+            self._evict()
+
+    def put_name(self, drug_name, fdb_id):
+        """Map another spelling to an FDB id whose monograph is already cached."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO drug_names (name, fdb_id, expires_at) VALUES (?, ?, ?)',
+                (normalize_drug_name(drug_name), fdb_id, time.time() + self.ttl)
+            )
+
+    def put_miss(self, drug_name):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO drug_names (name, fdb_id, expires_at) VALUES (?, NULL, ?)',
+                (normalize_drug_name(drug_name), time.time() + self.negative_ttl)
+            )
+
+    def _evict(self):
+        now = time.time()
+        self._conn.execute('DELETE FROM monographs WHERE expires_at <= ?', (now,))
+        self._conn.execute('DELETE FROM drug_names WHERE expires_at <= ?', (now,))
+        count = self._conn.execute('SELECT COUNT(*) FROM monographs').fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                'DELETE FROM monographs WHERE fdb_id IN '
+                '(SELECT fdb_id FROM monographs ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,)
+            )
+            self._conn.execute(
+                'DELETE FROM drug_names WHERE fdb_id IS NOT NULL AND fdb_id NOT IN (SELECT fdb_id FROM monographs)'
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM drug_names')
+            self._conn.execute('DELETE FROM monographs')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def text_digest(text):
+    """
+    SHA-256 of a note, ignoring trailing whitespace.
+
+    Only trailing whitespace is dropped so entity offsets from a cached result still line
+    up with the text being tokenized.
+    """
+    return hashlib.sha256(text.rstrip().encode('utf-8')).hexdigest()
+
+
+class TokenizationCache:
+    """
+    Two-tier cache of IMO NLP responses keyed by the SHA-256 of the note text.
+
+    A bounded in-memory LRU sits in front of a SQLite table, so Streamlit reruns hit
+    memory and re-runs in a new process still skip the NLP call.
+    """
+
+    def __init__(self, path=IMO_NLP_CACHE_PATH, ttl=IMO_NLP_CACHE_TTL,
+                 memory_entries=IMO_NLP_CACHE_MEMORY_ENTRIES):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS nlp_results ('
+                'digest TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def get(self, text):
+        digest = text_digest(text)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(digest)
+                self.memory_hits += 1
+                return entry[0]
+            row = self._conn.execute(
+                'SELECT result, expires_at FROM nlp_results WHERE digest = ? AND expires_at > ?', (digest, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            result = json.loads(row[0])
+            self._remember(digest, result, row[1])
+            self.disk_hits += 1
+            return result
+
+    def put(self, text, result):
+        digest = text_digest(text)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(digest, result, expires_at)
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO nlp_results (digest, result, expires_at) VALUES (?, ?, ?)',
+                    (digest, json.dumps(result), expires_at)
+                )
+                self._conn.execute('DELETE FROM nlp_results WHERE expires_at <= ?', (time.time(),))
+
+    def _remember(self, digest, result, expires_at):
+        self._memory[digest] = (result, expires_at)
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses
+        }
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._memory.clear()
+            self._conn.execute('DELETE FROM nlp_results')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def warm_fdb_cache(drug_names, cache=None):
+    """
+    Preload monographs for a formulary list into the FDB cache.
+
+    Returns:
+        (found, missing) counts
+    """
+    from lof.services import FDBService
+
+    fdb_service = FDBService(cache=cache or FDBDrugCache())
+    found = missing = 0
+    for drug_name in drug_names:
+        try:
+            info = fdb_service.get_drug_info(drug_name)
+        except Exception as e:
+            print(f"Failed to warm FDB cache for {drug_name}: {e}")
+            continue
+        if info:
+            found += 1
+        else:
+            missing += 1
+    return found, missing
+
+
+def _read_formulary(path):
+    with open(path, 'r') as formulary:
+        return [line.strip() for line in formulary if line.strip() and not line.startswith('#')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage local LoF service caches')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    warm_parser = subparsers.add_parser('warm-fdb', help='Preload FDB monographs for a formulary list')
+    warm_parser.add_argument('formulary', help='Text file with one drug name per line')
+    subparsers.add_parser('build-drug-index',
+                          help='Index indications and interactions from the cached FDB monographs')
+    args = parser.parse_args()
+
+    if args.command == 'warm-fdb':
+        found, missing = warm_fdb_cache(_read_formulary(args.formulary))
+        print(f"FDB cache warmed: {found} cached, {missing} not found in FDB")
+    elif args.command == 'build-drug-index':
+        from lof.drug_index import DRUG_INDEX_PATH, build_drug_index
+
+        drug_index = build_drug_index()
+        drug_index.save()
+        print(f"Drug index built: {len(drug_index)} facts saved to {DRUG_INDEX_PATH}")
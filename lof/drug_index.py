@@ -0,0 +1,236 @@
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from itertools import product
+
+from lof.cache import CACHE_DIR, FDBDrugCache, TokenizationCache
+
+DRUG_INDEX_PATH = os.path.join(CACHE_DIR, 'drug_index.sqlite3')
+
+# Semantic types of the IMO NLP entities that become index facts
+INDICATION_SEMANTICS = ('problem',)
+INTERACTION_SEMANTICS = ('drug',)
+
+Indication = namedtuple('Indication', ['drug', 'condition', 'evidence'])
+Interaction = namedtuple('Interaction', ['drug', 'other_drug', 'evidence'])
+
+
+def entity_keys(text, codemaps=None, lexical_code=None, ingredients=None):
+    """
+    Keys identifying a drug or condition in the index.
+
+    The case-folded text is always a key. IMO lexical codes, the first code of every other
+    code map (RxNorm for drugs) and ingredient codes are added when known, so a medication
+    order and a monograph mentioning the same ingredient share a key.
+    """
+    keys = {'text:' + ' '.join(text.casefold().split())}
+    if lexical_code:
+        keys.add(f'imo:{lexical_code}')
+    for system, codemap in (codemaps or {}).items():
+        if system.lower() == 'imo':
+            if codemap.get('lexical_code'):
+                keys.add(f"imo:{codemap['lexical_code']}")
+        elif codemap.get('codes'):
+            first_code = codemap['codes'][0]
+            code = first_code.get('rxnorm_code') or first_code.get('code')
+            if code:
+                keys.add(f'{system.lower()}:{code}')
+    for ingredient in ingredients or []:
+        if ingredient.get('code'):
+            keys.add(f"ingredient:{ingredient['code']}")
+    return frozenset(keys)
+
+
+def normalized_entity_keys(text, normalized):
+    """Keys for text from its IMO normalize result, as returned for normalize_text([text], domain)."""
+    items = []
+    for request in (normalized or {}).get('requests') or []:
+        items = (request.get('response') or {}).get('items') or []
+        break
+    if not items:
+        return entity_keys(text)
+    item = items[0]
+    return entity_keys(text, item.get('codemaps'), item.get('default_lexical_code'), item.get('ingredients'))
+
+
+def _sentence_at(text, begin, end):
+    start = max(text.rfind('.', 0, begin), text.rfind('\n', 0, begin)) + 1
+    stops = [position for position in (text.find('.', end), text.find('\n', end)) if position != -1]
+    stop = min(stops) + 1 if stops else len(text)
+    return ' '.join(text[start:stop].split())
+
+
+class DrugIndex:
+    """
+    Precomputed drug -> indicated condition and drug <-> drug interaction facts.
+
+    Facts are keyed by the entity_keys of both sides, so checking a medication against a
+    condition or another medication is a handful of dict lookups, independent of index size.
+    """
+
+    def __init__(self):
+        self._indications = {}
+        self._interactions = {}
+
+    def __len__(self):
+        return len(self._indications) + len(self._interactions)
+
+    def add_indication(self, drug_keys, condition_keys, indication):
+        for key in product(drug_keys, condition_keys):
+            self._indications.setdefault(key, indication)
+
+    def add_interaction(self, drug_keys, other_keys, interaction):
+        for drug_key, other_key in product(drug_keys, other_keys):
+            if drug_key != other_key:
+                self._interactions.setdefault(frozenset((drug_key, other_key)), interaction)
+
+    def indications(self, drug_keys, condition_keys):
+        """Indications linking a drug and a condition, given their entity_keys."""
+        found = (self._indications.get(key) for key in product(drug_keys, condition_keys))
+        return list(dict.fromkeys(fact for fact in found if fact))
+
+    def interactions(self, drug_keys, other_keys):
+        """Interactions between two drugs, given their entity_keys."""
+        found = (self._interactions.get(frozenset(pair)) for pair in product(drug_keys, other_keys)
+                 if pair[0] != pair[1])
+        return list(dict.fromkeys(fact for fact in found if fact))
+
+    def save(self, path=DRUG_INDEX_PATH):
+        # Written next to the target and renamed, so a running app never loads a partial index
+        target_path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            path = f'{path}.tmp'
+            if os.path.exists(path):
+                os.remove(path)
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                conn.execute('DROP TABLE IF EXISTS indications')
+                conn.execute('DROP TABLE IF EXISTS interactions')
+                conn.execute(
+                    'CREATE TABLE indications (drug_key TEXT, condition_key TEXT, drug TEXT, condition TEXT, '
+                    'evidence TEXT, PRIMARY KEY (drug_key, condition_key))'
+                )
+                conn.execute(
+                    'CREATE TABLE interactions (drug_key TEXT, other_key TEXT, drug TEXT, other_drug TEXT, '
+                    'evidence TEXT, PRIMARY KEY (drug_key, other_key))'
+                )
+                conn.executemany(
+                    'INSERT INTO indications VALUES (?, ?, ?, ?, ?)',
+                    (key + tuple(fact) for key, fact in self._indications.items())
+                )
+                conn.executemany(
+                    'INSERT INTO interactions VALUES (?, ?, ?, ?, ?)',
+                    (tuple(sorted(key)) + tuple(fact) for key, fact in self._interactions.items())
+                )
+        finally:
+            conn.close()
+        if path != target_path:
+            os.replace(path, target_path)
+
+    @classmethod
+    def load(cls, path=DRUG_INDEX_PATH):
+        """Load a saved index, or return an empty one if it has not been built yet."""
+        index = cls()
+        if path != ':memory:' and not os.path.exists(path):
+            return index
+        conn = sqlite3.connect(path)
+        try:
+            for drug_key, condition_key, drug, condition, evidence in conn.execute('SELECT * FROM indications'):
+                index._indications[(drug_key, condition_key)] = Indication(drug, condition, evidence)
+            for drug_key, other_key, drug, other_drug, evidence in conn.execute('SELECT * FROM interactions'):
+                index._interactions[frozenset((drug_key, other_key))] = Interaction(drug, other_drug, evidence)
+        except sqlite3.OperationalError as e:
+            print(f"Failed to load drug index from {path}: {e}")
+        finally:
+            conn.close()
+        return index
+
+
+def _normalize_all(normalize_service, entities, domain, batch_size):
+    from lof.services import split_normalized
+
+    keys = {}
+    entities = list(dict.fromkeys(entities))
+    for i in range(0, len(entities), batch_size):
+        chunk = entities[i:i + batch_size]
+        try:
+            result = normalize_service.normalize_text(entities=chunk, domain=domain)
+        except Exception as e:
+            print(f"Failed to normalize {len(chunk)} {domain} entities, indexing them by text only: {e}")
+            result = {'error': str(e)}
+        # Entities IMO returned no result for have an error entry and are keyed by text only
+        for entity, normalized in split_normalized(chunk, result).items():
+            keys[entity] = normalized_entity_keys(entity, normalized)
+    return keys
+
+
+def build_drug_index(fdb_cache=None, nlp_service=None, normalize_service=None):
+    """
+    Build the index from every monograph in the FDB cache.
+
+    The uses and cautions of each monograph are run through IMO NLP. Problems found in the
+    uses become indications and drugs found in the cautions become interactions. Monograph
+    drug names and mentioned drugs are IMO normalized in batches to get their codes.
+    """
+    from lof.services import IMONLPService, IMONormalizeService, IMO_NORMALIZE_BATCH_SIZE
+
+    fdb_cache = fdb_cache or FDBDrugCache()
+    nlp_service = nlp_service or IMONLPService(cache=TokenizationCache())
+    normalize_service = normalize_service or IMONormalizeService()
+
+    monographs = []
+    for fdb_id, drug_names, info in fdb_cache.monographs():
+        names = list(dict.fromkeys(drug_names + ([info['name']] if info.get('name') else [])))
+        if not names:
+            # Nothing to key its facts by, no drug name maps to it and FDB gave it no title
+            print(f"Monograph {fdb_id} has no drug name, skipping it")
+            continue
+        uses = _entities(nlp_service, fdb_id, info.get('uses'), INDICATION_SEMANTICS, present_only=True)
+        # Cautions name drugs to avoid, which IMO asserts as absent or hypothetical
+        cautions = _entities(nlp_service, fdb_id, info.get('caution'), INTERACTION_SEMANTICS, present_only=False)
+        monographs.append((names, info, uses, cautions))
+
+    drug_names = [name for names, _, _, _ in monographs for name in names]
+    mentions = [entity['text'] for _, _, _, cautions in monographs for entity, _ in cautions]
+    drug_keys = _normalize_all(normalize_service, drug_names + mentions, 'medication', IMO_NORMALIZE_BATCH_SIZE)
+
+    index = DrugIndex()
+    for names, info, uses, cautions in monographs:
+        keys = frozenset().union(*(drug_keys[name] for name in names))
+        drug = info.get('name') or names[0]
+        for entity, evidence in uses:
+            condition_keys = entity_keys(entity['text'], entity.get('codemaps'))
+            index.add_indication(keys, condition_keys, Indication(drug, entity['text'], evidence))
+        for entity, evidence in cautions:
+            other_keys = drug_keys[entity['text']] | entity_keys(entity['text'], entity.get('codemaps'))
+            if other_keys & keys:
+                continue
+            index.add_interaction(keys, other_keys, Interaction(drug, entity['text'], evidence))
+    return index
+
+
+def _entities(nlp_service, fdb_id, text, semantics, present_only):
+    """(entity, sentence it was found in) for the entities of the given semantic types."""
+    if isinstance(text, list):
+        text = '\n'.join(str(line) for line in text)
+    if not text or not text.strip():
+        return []
+    try:
+        result = nlp_service.tokenize_text(text)
+    except Exception as e:
+        print(f"Failed to tokenize monograph {fdb_id}, skipping it: {e}")
+        return []
+    found = []
+    for entity in result.get('entities') or []:
+        if entity.get('semantic') not in semantics:
+            continue
+        if present_only and entity.get('assertion', 'present') != 'present':
+            continue
+        if not re.sub(r'\W', '', entity.get('text') or ''):
+            continue
+        begin = entity.get('begin') or 0
+        found.append((entity, _sentence_at(text, begin, entity.get('end') or begin)))
+    return found
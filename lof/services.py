@@ -1,6 +1,15 @@
+import asyncio
 import os
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from dotenv import load_dotenv
 
@@ -12,113 +21,654 @@ BASE_HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Connection pool and retry settings for outbound LoF calls
+HTTP_POOL_SIZE = int(os.getenv('LOF_HTTP_POOL_SIZE', '10'))
+HTTP_TIMEOUT = float(os.getenv('LOF_HTTP_TIMEOUT', '30'))
+HTTP_MAX_RETRIES = int(os.getenv('LOF_HTTP_MAX_RETRIES', '3'))
+HTTP_BACKOFF_FACTOR = float(os.getenv('LOF_HTTP_BACKOFF_FACTOR', '0.5'))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
 
-def get_lof_auth_token():
-    lof_credentials = {
+# Tokens are refreshed this many seconds before they expire
+TOKEN_EXPIRY_MARGIN = 60
+# Lifetime assumed when a token response does not carry expires_in
+DEFAULT_TOKEN_TTL = 300
+
+
+class TokenManager:
+    """
+    Caches a bearer token until shortly before it expires.
+
+    Refreshes are single-flight: concurrent threads and coroutines asking for an
+    expired token wait on the one in-flight fetch instead of minting their own. Every
+    refresh, sync or async and from any event loop, runs under the same thread lock.
+    """
+
+    def __init__(self, fetch_token, expiry_margin=TOKEN_EXPIRY_MARGIN):
+        """
+        Args:
+            fetch_token: Callable returning (access_token, expires_in_seconds or None)
+            expiry_margin: Seconds before expiry at which the token is considered stale
+        """
+        self._fetch_token = fetch_token
+        self._expiry_margin = expiry_margin
+        self._lock = threading.Lock()
+        self._token = None
+        self._refresh_at = 0.0
+
+    def _cached_token(self):
+        if self._token and time.monotonic() < self._refresh_at:
+            return self._token
+        return None
+
+    def get_token(self):
+        token = self._cached_token()
+        if token:
+            return token
+        with self._lock:
+            token = self._cached_token()
+            if token:
+                return token
+            token, expires_in = self._fetch_token()
+            self._store(token, expires_in)
+            return token
+
+    async def get_token_async(self):
+        token = self._cached_token()
+        if token:
+            return token
+        # Refresh off the event loop; the thread lock keeps it single-flight
+        return await asyncio.to_thread(self.get_token)
+
+    def _store(self, token, expires_in):
+        # Only called with self._lock held
+        ttl = expires_in or DEFAULT_TOKEN_TTL
+        # Short-lived tokens still get half their lifetime rather than none
+        self._token = token
+        self._refresh_at = time.monotonic() + max(ttl - self._expiry_margin, ttl / 2)
+
+    def invalidate(self, token=None):
+        """
+        Drop the cached token so the next caller refreshes it.
+
+        Args:
+            token: If given, only invalidate when it is still the cached token, so a
+                   stale 401 does not discard a token another caller just refreshed
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._refresh_at = 0.0
+
+
+def _close_async_client(loop, client):
+    """
+    Close an httpx.AsyncClient bound to an event loop other than the running one.
+
+    The close is scheduled on the client's own loop. A client whose loop has already closed
+    cannot close its transports any more and is only dropped, so the garbage collector
+    releases its sockets.
+    """
+    if not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+
+def _base_url_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class HTTPTransport:
+    """
+    Pooled keep-alive HTTP clients shared by every LoF service.
+
+    Keeps one requests.Session and one httpx.AsyncClient per base URL so repeated calls
+    reuse open TCP/TLS connections. Connection errors, 429 and 5xx responses are retried
+    with exponential backoff, honouring Retry-After. LoF endpoints are read-only lookups,
+    so POSTs are retried as well.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT, max_retries=HTTP_MAX_RETRIES,
+                 backoff_factor=HTTP_BACKOFF_FACTOR):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._async_clients = {}
+
+    def session(self, base_url):
+        with self._lock:
+            session = self._sessions.get(base_url)
+            if session is None:
+                retry = Retry(
+                    total=self.max_retries,
+                    backoff_factor=self.backoff_factor,
+                    status_forcelist=RETRY_STATUS_CODES,
+                    allowed_methods=None,
+                    respect_retry_after_header=True,
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount(base_url, adapter)
+                self._sessions[base_url] = session
+            return session
+
+    def async_client(self, base_url):
+        # httpx clients are bound to the event loop that first used them
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(base_url)
+            if entry is None or entry[0] is not loop or entry[1].is_closed:
+                if entry is not None and entry[0] is not loop:
+                    _close_async_client(*entry)
+                limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+                client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+                entry = (loop, client)
+                self._async_clients[base_url] = entry
+            return entry[1]
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session(_base_url_of(url)).request(method, url, **kwargs)
+
+    async def request_async(self, method, url, **kwargs):
+        client = self.async_client(_base_url_of(url))
+        attempt = 0
+        while True:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+            await asyncio.sleep(self._retry_delay(response, attempt))
+            attempt += 1
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * (2 ** attempt) * (0.5 + random.random())
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entries = list(self._async_clients.values())
+            self._async_clients.clear()
+        for client_loop, client in entries:
+            if client_loop is loop:
+                await client.aclose()
+            else:
+                _close_async_client(client_loop, client)
+
+
+http_transport = HTTPTransport()
+
+
+def _lof_credentials():
+    return {
         "client_id": os.getenv('client_id'),
         "client_secret": os.getenv('client_secret')
     }
-    response = requests.post(BASE_URL + '/generate-access-token/', json=lof_credentials, headers=BASE_HEADERS)
+
+
+def _post_lof_auth_token():
+    return http_transport.request('POST', BASE_URL + '/generate-access-token/', json=_lof_credentials(),
+                                  headers=BASE_HEADERS)
+
+
+def get_lof_auth_token():
+    response = _post_lof_auth_token()
     if response.status_code == 200:
         return response.status_code, response.json()['access_token']
     return response.status_code, response.json()['error']
 
 
+def _lof_auth_token_from_response(response):
+    if response.status_code == 200:
+        response_json = response.json()
+        return response_json['access_token'], response_json.get('expires_in')
+    print(f"Failed to get LoF auth token: {response.status_code} : {response.json()['error']}")
+    raise Exception(f"Failed to get LoF auth token: {response.status_code}")
+
+
+def _fetch_lof_auth_token():
+    return _lof_auth_token_from_response(_post_lof_auth_token())
+
+
+lof_token_manager = TokenManager(_fetch_lof_auth_token)
+
+
+def _bearer_headers(token):
+    return {
+        "Content-Type": "application/json",
+        "Authorization": "Bearer " + token
+    }
+
+
 def lof_service_request_headers():
-    status_code, lof_auth_token = get_lof_auth_token()
-    if status_code == 200:
-        return {
-            "Content-Type": "application/json",
-            "Authorization": "Bearer " + lof_auth_token
-        }
+    return _bearer_headers(lof_token_manager.get_token())
+
+
+def lof_service_request(method, path, **kwargs):
+    """
+    Send an authenticated request to a LoF service endpoint.
+
+    A 401 invalidates the cached LoF token and the request is retried once with a fresh one.
+    """
+    token = lof_token_manager.get_token()
+    response = http_transport.request(method, BASE_URL + path, headers=_bearer_headers(token), **kwargs)
+    if response.status_code == 401:
+        lof_token_manager.invalidate(token)
+        token = lof_token_manager.get_token()
+        response = http_transport.request(method, BASE_URL + path, headers=_bearer_headers(token), **kwargs)
+    return response
+
+
+async def lof_service_request_async(method, path, **kwargs):
+    """Async counterpart of lof_service_request on the shared httpx client."""
+    token = await lof_token_manager.get_token_async()
+    response = await http_transport.request_async(method, BASE_URL + path, headers=_bearer_headers(token),
+                                                  **kwargs)
+    if response.status_code == 401:
+        lof_token_manager.invalidate(token)
+        token = await lof_token_manager.get_token_async()
+        response = await http_transport.request_async(method, BASE_URL + path, headers=_bearer_headers(token),
+                                                      **kwargs)
+    return response
+
+
+def _downstream_token_from_response(response, service_name):
+    if response.status_code == 200:
+        response_json = response.json()
+        return response_json['access_token'], response_json.get('expires_in')
+    print(f"Failed to get {service_name} token: {response.status_code} : {response.json()['message']}")
+    raise Exception(f"Failed to get {service_name} token: {response.status_code}")
+
+
+def _fetch_hg_token():
+    return _downstream_token_from_response(lof_service_request('POST', '/hg/token/', json={}), 'Health Gorilla')
+
+
+def _fetch_ah_token():
+    return _downstream_token_from_response(lof_service_request('POST', '/ah/token/', json={}),
+                                           'Abstractive Health')
+
+
+hg_token_manager = TokenManager(_fetch_hg_token)
+ah_token_manager = TokenManager(_fetch_ah_token)
+
+
+def _is_unauthorized(response):
+    return response is not None and getattr(response, 'status_code', None) == 401
+
+
+def call_with_bearer_token(token_manager, call):
+    """
+    Run call(token) with the cached token. If the service rejects it with a 401, the token
+    is invalidated and call runs once more with a fresh one.
+
+    call may return the response or raise the requests.HTTPError from raise_for_status.
+    """
+    token = token_manager.get_token()
+    try:
+        result = call(token)
+    except requests.HTTPError as e:
+        if not _is_unauthorized(e.response):
+            raise
     else:
-        print(f"Failed to get LoF auth token: {status_code} : {lof_auth_token}")
-        raise Exception(f"Failed to get LoF auth token: {status_code}")
+        if not _is_unauthorized(result):
+            return result
+    token_manager.invalidate(token)
+    return call(token_manager.get_token())
+
+
+async def call_with_bearer_token_async(token_manager, call):
+    """Async counterpart of call_with_bearer_token, for a call returning an awaitable."""
+    token = await token_manager.get_token_async()
+    try:
+        result = await call(token)
+    except (requests.HTTPError, httpx.HTTPStatusError) as e:
+        if not _is_unauthorized(e.response):
+            raise
+    else:
+        if not _is_unauthorized(result):
+            return result
+    token_manager.invalidate(token)
+    return await call(await token_manager.get_token_async())
 
 
 class HealthGorillaTokenService:
 
     def get_bearer_token(self):
-        response = requests.post(BASE_URL + '/hg/token/', json={}, headers=lof_service_request_headers())
-        if response.status_code == 200:
-            return response.json()['access_token']
-        else:
-            print(f"Failed to get Health Gorilla token: {response.status_code} : {response.json()['message']}")
-            raise Exception(f"Failed to get Health Gorilla token: {response.status_code}")
+        return hg_token_manager.get_token()
+
+    def call_with_bearer_token(self, call):
+        """Run call(token) against Health Gorilla, refreshing the token once on a 401."""
+        return call_with_bearer_token(hg_token_manager, call)
+
+
+class AsyncHealthGorillaTokenService(HealthGorillaTokenService):
+
+    async def get_bearer_token(self):
+        return await hg_token_manager.get_token_async()
+
+    async def call_with_bearer_token(self, call):
+        return await call_with_bearer_token_async(hg_token_manager, call)
+
 
 class AbstractiveHealthTokenService:
+
     def get_bearer_token(self):
-        response = requests.post(BASE_URL + '/ah/token/', json={}, headers=lof_service_request_headers())
-        if response.status_code == 200:
-            return response.json()['access_token']
-        else:
-            print(f"Failed to get Abstractive Health token: {response.status_code} : {response.json()['message']}")
-            raise Exception(f"Failed to get Abstractive Health token: {response.status_code}")
+        return ah_token_manager.get_token()
+
+    def call_with_bearer_token(self, call):
+        """Run call(token) against Abstractive Health, refreshing the token once on a 401."""
+        return call_with_bearer_token(ah_token_manager, call)
+
+
+class AsyncAbstractiveHealthTokenService(AbstractiveHealthTokenService):
+
+    async def get_bearer_token(self):
+        return await ah_token_manager.get_token_async()
+
+    async def call_with_bearer_token(self, call):
+        return await call_with_bearer_token_async(ah_token_manager, call)
+
+
+def _imo_tokens_from_response(response):
+    if response.status_code == 200:
+        return response.json()
+    else:
+        print(f"Failed to Retrieve IMO Tokens: {response.status_code} : {response.json()['message']}")
+        raise Exception(f"Failed to get Retrieve IMO Tokens: {response.status_code}")
 
 
 class IMONLPService:
 
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache: Optional lof.cache.TokenizationCache consulted before calling IMO NLP
+        """
+        self.cache = cache
+
     def tokenize_text(self, text):
-        response = requests.post(BASE_URL + '/imo/nlp', json={'text': text}, headers=lof_service_request_headers())
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Failed to Retrieve IMO Tokens: {response.status_code} : {response.json()['message']}")
-            raise Exception(f"Failed to get Retrieve IMO Tokens: {response.status_code}")
+        if self.cache:
+            result = self.cache.get(text)
+            if result is not None:
+                return result
+        result = _imo_tokens_from_response(lof_service_request('POST', '/imo/nlp', json={'text': text}))
+        if self.cache:
+            self.cache.put(text, result)
+        return result
+
+
+class AsyncIMONLPService(IMONLPService):
+
+    async def tokenize_text(self, text):
+        if self.cache:
+            result = self.cache.get(text)
+            if result is not None:
+                return result
+        result = _imo_tokens_from_response(await lof_service_request_async('POST', '/imo/nlp', json={'text': text}))
+        if self.cache:
+            self.cache.put(text, result)
+        return result
+
+
+def _normalize_request(entities, domain):
+    return {
+        "entities": entities,
+        "domain": domain,
+        "match_field": "input_term",
+        "input_code_system": "",
+        "threshold": 0
+    }
+
+
+def _normalized_from_response(response):
+    if response.status_code == 200:
+        return response.json()
+    else:
+        print(f"Failed to Normalize Text: {response.status_code} : {response.json()['message']}")
+        raise Exception(f"Failed to Normalize Text: {response.status_code}")
 
 
 class IMONormalizeService:
 
     def normalize_text(self, entities, domain):
-        json_data = {
-            "entities": entities,
-            "domain": domain,
-            "match_field": "input_term",
-            "input_code_system": "",
-            "threshold": 0
-        }
-        response = requests.post(BASE_URL + '/imo/normalize', json=json_data, headers=lof_service_request_headers())
-        if response.status_code == 200:
-            return response.json()
+        response = lof_service_request('POST', '/imo/normalize', json=_normalize_request(entities, domain))
+        return _normalized_from_response(response)
+
+
+class AsyncIMONormalizeService:
+
+    async def normalize_text(self, entities, domain):
+        response = await lof_service_request_async('POST', '/imo/normalize', json=_normalize_request(entities, domain))
+        return _normalized_from_response(response)
+
+
+def _input_term_key(term):
+    return ' '.join(str(term).casefold().split())
+
+
+def split_normalized(entities, result):
+    """
+    Split a batched normalize_text result into one result per entity, each shaped like
+    normalize_text([entity], domain).
+
+    Requests are matched to entities by the input_term the service echoes back rather than
+    by position, so a reordered, merged or dropped request never hands one entity another's
+    normalization. Entities without a matching request get an error result.
+    """
+    if 'error' in result:
+        return {entity: {'error': result['error']} for entity in entities}
+    requests_by_term = {}
+    for request in result.get('requests') or []:
+        if request.get('input_term') is not None:
+            requests_by_term.setdefault(_input_term_key(request['input_term']), request)
+    split = {}
+    for entity in entities:
+        request = requests_by_term.get(_input_term_key(entity))
+        if request is None:
+            split[entity] = {'error': f"No normalize result returned for {entity}"}
         else:
-            print(f"Failed to Normalize Text: {response.status_code} : {response.json()['message']}")
-            raise Exception(f"Failed to Normalize Text: {response.status_code}")
+            split[entity] = {'requests': [request]}
+    return split
+
+
+# Most entities the IMO normalize endpoint accepts in one request
+IMO_NORMALIZE_BATCH_SIZE = int(os.getenv('LOF_IMO_NORMALIZE_BATCH_SIZE', '50'))
+# How long the batching normalizer waits to collect entities before sending
+IMO_NORMALIZE_BATCH_WINDOW = float(os.getenv('LOF_IMO_NORMALIZE_BATCH_WINDOW', '0.02'))
+
+
+class BatchingIMONormalizer:
+    """
+    Coalesces single-entity IMO normalize calls into batched requests.
+
+    Entities requested within a short window are grouped per domain, de-duplicated,
+    split into chunks of at most batch_size, and the chunks are sent concurrently.
+    Each caller gets back a response shaped like normalize_text([entity], domain).
+    """
+
+    def __init__(self, batch_size=IMO_NORMALIZE_BATCH_SIZE, window=IMO_NORMALIZE_BATCH_WINDOW, service=None):
+        self.batch_size = batch_size
+        self.window = window
+        self._service = service or AsyncIMONormalizeService()
+        # Per event loop: domain -> list of (entity, future) waiting to be sent, and
+        # domain -> timer that sends them when the window closes
+        self._pending = weakref.WeakKeyDictionary()
+        self._timers = weakref.WeakKeyDictionary()
+        # In-flight sends, referenced until done so they are not garbage collected
+        self._tasks = set()
+
+    async def normalize(self, entity, domain):
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(loop, {})
+        future = loop.create_future()
+        if domain not in pending:
+            pending[domain] = []
+            self._timers.setdefault(loop, {})[domain] = loop.call_later(self.window, self._flush, loop, domain)
+        pending[domain].append((entity, future))
+        if len(pending[domain]) >= self.batch_size:
+            self._flush(loop, domain)
+        return await future
+
+    async def normalize_many(self, entities, domain):
+        return await asyncio.gather(*(self.normalize(entity, domain) for entity in entities))
+
+    def _flush(self, loop, domain):
+        # A batch that filled up is sent early, so its window's timer must not flush the next one
+        timer = self._timers.get(loop, {}).pop(domain, None)
+        if timer is not None:
+            timer.cancel()
+        waiting = self._pending.get(loop, {}).pop(domain, None)
+        if not waiting:
+            return
+        futures_by_entity = {}
+        for entity, future in waiting:
+            futures_by_entity.setdefault(entity, []).append(future)
+        entities = list(futures_by_entity)
+        for i in range(0, len(entities), self.batch_size):
+            chunk = entities[i:i + self.batch_size]
+            task = loop.create_task(self._send(chunk, domain, futures_by_entity))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, entities, domain, futures_by_entity):
+        try:
+            result = await self._service.normalize_text(entities=entities, domain=domain)
+        except Exception as e:
+            for entity in entities:
+                for future in futures_by_entity[entity]:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for entity, entity_result in split_normalized(entities, result).items():
+            for future in futures_by_entity[entity]:
+                if not future.done():
+                    future.set_result(entity_result)
+
+
+def _drug_info_from_response(response):
+    if response.status_code == 200:
+        response_json = response.json()
+        name = response_json['title']
+        uses = response_json['content']['uses']
+        instructions = response_json['content']['instructions']
+        cautions = response_json['content']['cautions']
+        sideEffects = response_json['content']['sideEffects']
+        extra = response_json['content']['extra']
+        disclaimer = response_json['content']['disclaimer']
+
+        return {
+            'name': name,
+            'uses': uses,
+            'instructions': instructions,
+            'caution': cautions,
+            'side_effects': sideEffects,
+            'extra': extra,
+            'disclaimer': disclaimer
+        }
+    else:
+        print(f"Failed to get FDB drug info: {response.status_code} : {response.json()['message']}")
+        raise Exception(f"Failed to get FDB drug info: {response.status_code}")
+
+
+def _best_match_id(response):
+    """
+    FDB id of the smart search best match, or None when FDB answered and matched nothing.
+
+    Failed and malformed responses raise, so callers never cache an outage as a miss.
+    """
+    if response.status_code != 200:
+        print(f"Failed to search FDB: {response.status_code} : {response.text[:200]}")
+        raise Exception(f"Failed to search FDB: {response.status_code}")
+    data = response.json().get('data')
+    if not isinstance(data, dict):
+        raise Exception("Failed to search FDB: response has no data")
+    best_match = data.get('best_match')
+    return best_match['id'] if best_match else None
 
 
 class FDBService:
 
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache: Optional lof.cache.FDBDrugCache consulted before calling FDB
+        """
+        self.cache = cache
+
     def get_drug_info(self, drug_name):
-        response = requests.get(BASE_URL + '/fdb/smart-search', params={'name': drug_name},
-                                headers=lof_service_request_headers())
+        if self.cache:
+            hit, info = self.cache.get(drug_name)
+            if hit:
+                return info
+
+        response = lof_service_request('GET', '/fdb/smart-search', params={'name': drug_name})
+        id = _best_match_id(response)
+        if id is None:
+            if self.cache:
+                self.cache.put_miss(drug_name)
+            return None
+
+        if self.cache:
+            info = self.cache.get_by_id(id)
+            if info:
+                self.cache.put_name(drug_name, id)
+                return info
+
+        response = lof_service_request('GET', '/fdb/meducation/content', params={'code': id})
+        info = _drug_info_from_response(response)
+        if self.cache:
+            self.cache.put(drug_name, id, info)
+        return info
+
+
+class AsyncFDBService(FDBService):
+
+    async def get_drug_info(self, drug_name):
+        if self.cache:
+            hit, info = self.cache.get(drug_name)
+            if hit:
+                return info
+
+        response = await lof_service_request_async('GET', '/fdb/smart-search', params={'name': drug_name})
+        id = _best_match_id(response)
+        if id is None:
+            if self.cache:
+                self.cache.put_miss(drug_name)
+            return None
+
+        if self.cache:
+            info = self.cache.get_by_id(id)
+            if info:
+                self.cache.put_name(drug_name, id)
+                return info
+
+        response = await lof_service_request_async('GET', '/fdb/meducation/content', params={'code': id})
+        info = _drug_info_from_response(response)
+        if self.cache:
+            self.cache.put(drug_name, id, info)
+        return info
+
 
-        response_json = response.json()
-        id = response_json['data']['best_match']['id']
-        response = requests.get(BASE_URL + f'/fdb/meducation/content', params={'code': id},
-                                headers=lof_service_request_headers())
-
-        if response.status_code == 200:
-            response_json = response.json()
-            name = response_json['title']
-            uses = response_json['content']['uses']
-            instructions = response_json['content']['instructions']
-            cautions = response_json['content']['cautions']
-            sideEffects = response_json['content']['sideEffects']
-            extra = response_json['content']['extra']
-            disclaimer = response_json['content']['disclaimer']
-
-            return {
-                'name': name,
-                'uses': uses,
-                'instructions': instructions,
-                'caution': cautions,
-                'side_effects': sideEffects,
-                'extra': extra,
-                'disclaimer': disclaimer
-            }
-        else:
-            print(f"Failed to get FDB drug info: {response.status_code} : {response.json()['message']}")
-            raise Exception(f"Failed to get FDB drug info: {response.status_code}")
-        
 if __name__ == '__main__':
     token = lof_service_request_headers()
     print('LoF Services verified successfully')